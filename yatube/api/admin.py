@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from .models import Token
+
+
+class TokenAdmin(admin.ModelAdmin):
+    list_display = ('user', 'created')
+    search_fields = ('user__username',)
+    raw_id_fields = ('user',)
+
+
+admin.site.register(Token, TokenAdmin)
@@ -0,0 +1,44 @@
+"""Авторизация запросов API: токен или cookie сессии с CSRF-токеном.
+
+Запрос с заголовком ``Authorization: Token <ключ>`` выполняется от имени
+владельца токена, и CSRF для него не проверяется: браузер такой
+заголовок сам не подставит. Пишущие запросы с cookie сессии проверяются
+на CSRF здесь же, чтобы ошибка пришла в JSON, а не страницей
+CSRF_FAILURE_VIEW.
+"""
+from django.middleware.csrf import CsrfViewMiddleware
+
+from .models import Token
+
+KEYWORD = 'Token'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def token_user(request):
+    """Владелец токена из заголовка, None без заголовка."""
+    keyword, _, key = request.META.get(
+        'HTTP_AUTHORIZATION', '').partition(' ')
+    if keyword != KEYWORD:
+        return None
+    token = Token.objects.select_related('user').filter(
+        key=key.strip(), user__is_active=True).first()
+    if token is None:
+        raise InvalidToken
+    return token.user
+
+
+class _CsrfCheck(CsrfViewMiddleware):
+    def _reject(self, request, reason):
+        return reason
+
+
+def csrf_failure(request):
+    """Причина отказа CSRF или None, если запрос прошёл проверку."""
+    if request.method in SAFE_METHODS or not request.user.is_authenticated:
+        return None
+    return _CsrfCheck(lambda request: None).process_view(
+        request, None, (), {})
@@ -0,0 +1,30 @@
+import secrets
+
+from django.contrib.auth import get_user_model
+from django.db import models
+
+User = get_user_model()
+
+
+def new_key():
+    return secrets.token_hex(20)
+
+
+class Token(models.Model):
+    """Ключ API для клиентов без cookie сессии сайта."""
+    key = models.CharField('Ключ', max_length=40, primary_key=True,
+                           default=new_key, editable=False)
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='api_token',
+        verbose_name='Пользователь'
+    )
+    created = models.DateTimeField('Дата создания', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Токен API'
+        verbose_name_plural = 'Токены API'
+
+    def __str__(self):
+        return f'Токен {self.user}'
@@ -0,0 +1,86 @@
+"""Сериализация строк ``.values()`` в словари ответа без создания моделей.
+
+Каждое поле ответа — это путь ORM и, при необходимости, функция
+преобразования значения. Параметр запроса ``fields`` сужает набор
+полей, и в SELECT попадают только нужные столбцы.
+"""
+from django.core.files.storage import default_storage
+
+
+class FieldError(ValueError):
+    """В ``fields`` запрошено поле, которого нет в ответе."""
+
+
+def _file_url(name):
+    return default_storage.url(name) if name else None
+
+
+class Serializer:
+    def __init__(self, fields, converters=None, prefix=''):
+        self.fields = fields
+        self.converters = converters or {}
+        self.prefix = prefix
+
+    def nested(self, prefix):
+        """Тот же набор полей у связанной модели, например ``post__``."""
+        return Serializer(self.fields, self.converters, prefix)
+
+    def select(self, requested=None):
+        """Поля ответа по параметру ``fields`` (через запятую)."""
+        if not requested:
+            return list(self.fields)
+        names = [name.strip() for name in requested.split(',')
+                 if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise FieldError(f'Неизвестные поля: {", ".join(unknown)}. '
+                             f'Доступны: {", ".join(self.fields)}.')
+        return list(dict.fromkeys(names))
+
+    def lookups(self, names):
+        return [self.prefix + self.fields[name] for name in names]
+
+    def dump(self, rows, names):
+        columns = [(name, self.prefix + self.fields[name],
+                    self.converters.get(name)) for name in names]
+        return [
+            {name: convert(row[lookup]) if convert else row[lookup]
+             for name, lookup, convert in columns}
+            for row in rows
+        ]
+
+
+POST = Serializer(
+    {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'updated_at': 'updated_at',
+        'revision': 'revision',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+    },
+    {'image': _file_url},
+)
+# Число комментариев есть только у отдельного поста: поколение ленты
+# от комментариев не меняется, и ETag ленты его бы не учитывал.
+POST_DETAIL = Serializer(
+    {**POST.fields, 'comments_count': 'comments_count'}, POST.converters)
+COMMENT = Serializer({
+    'id': 'id',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+    'updated_at': 'updated_at',
+    'revision': 'revision',
+})
+PROFILE = Serializer({
+    'username': 'username',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'posts_count': 'counters__posts_count',
+    'followers_count': 'counters__followers_count',
+    'following_count': 'counters__following_count',
+})
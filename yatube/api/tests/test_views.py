@@ -0,0 +1,236 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.views import NUM_POST
+
+from ..models import Token
+
+User = get_user_model()
+
+
+class ApiTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Пост {number}',
+                                group=cls.group if number % 2 else None)
+            for number in range(NUM_POST + 2)
+        ]
+        cls.post = cls.posts[-1]
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Ок')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def post_json(self, url, data, method='post'):
+        return getattr(self.client, method)(
+            url, json.dumps(data), content_type='application/json')
+
+
+class ApiReadTest(ApiTestCase):
+    def test_feed_pages(self):
+        url = reverse('api:posts')
+        first = self.client.get(url).json()
+        self.assertEqual(len(first['results']), NUM_POST)
+        self.assertEqual(first['results'][0]['text'], self.post.text)
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual([row['text'] for row in second['results']],
+                         ['Пост 1', 'Пост 0'])
+        self.assertIsNone(second['next'])
+
+    def test_sparse_fields(self):
+        response = self.client.get(reverse('api:posts'),
+                                   {'fields': 'id,author'})
+        self.assertEqual(response.json()['results'][0],
+                         {'id': self.post.pk, 'author': 'author'})
+        self.assertIn('fields=id%2Cauthor', response.json()['next'])
+
+    def test_unknown_field(self):
+        response = self.client.get(reverse('api:posts'), {'fields': 'secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['error'])
+
+    def test_rows_without_model_instances(self):
+        """Лента — один запрос, а поля ответа — только запрошенные."""
+        url = reverse('api:posts')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, {'fields': 'text'})
+        feed, = [query['sql'] for query in queries
+                 if 'FROM "posts_post"' in query['sql']]
+        self.assertNotIn('"posts_post"."image"', feed)
+
+    def test_group_and_profile_feeds(self):
+        group = self.client.get(
+            reverse('api:group_posts', args=['group'])).json()
+        self.assertTrue(all(row['group'] == 'group'
+                            for row in group['results']))
+        profile = self.client.get(
+            reverse('api:profile_posts', args=['author'])).json()
+        self.assertEqual(len(profile['results']), NUM_POST)
+        missing = self.client.get(reverse('api:group_posts', args=['none']))
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(missing.json(), {'error': 'Не найдено.'})
+
+    def test_detail_and_comments(self):
+        detail = self.client.get(reverse('api:post', args=[self.post.pk]))
+        self.assertEqual(detail.json()['comments_count'], 1)
+        comments = self.client.get(
+            reverse('api:comments', args=[self.post.pk])).json()
+        self.assertEqual(comments['results'][0]['author'], 'reader')
+        missing = self.client.get(reverse('api:comments', args=[10 ** 6]))
+        self.assertEqual(missing.status_code, 404)
+
+    def test_profile(self):
+        self.client.force_login(self.reader)
+        data = self.client.get(reverse('api:profile', args=['author'])).json()
+        self.assertEqual(data['posts_count'], NUM_POST + 2)
+        self.assertEqual(data['followers_count'], 1)
+        self.assertTrue(data['following'])
+
+    def test_follow_feed_requires_login(self):
+        url = reverse('api:follow_index')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.reader)
+        self.assertEqual(len(self.client.get(url).json()['results']),
+                         NUM_POST)
+
+
+class ApiConditionalGetTest(ApiTestCase):
+    def test_not_modified_without_feed_query(self):
+        url = reverse('api:posts')
+        first = self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url,
+                                       HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+
+    def test_etag_changes_with_content(self):
+        url = reverse('api:post', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.reader, text='Да')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since(self):
+        url = reverse('api:post', args=[self.post.pk])
+        response = self.client.get(url)
+        self.assertEqual(self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        ).status_code, 304)
+
+    def test_personal_feed_etag(self):
+        url = reverse('api:follow_index')
+        self.client.force_login(self.reader)
+        reader_etag = self.client.get(url)['ETag']
+        self.client.force_login(self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=reader_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+
+class ApiWriteTest(ApiTestCase):
+    def test_create_post(self):
+        url = reverse('api:posts')
+        data = {'text': 'Из приложения', 'group': 'group'}
+        self.assertEqual(self.post_json(url, data).status_code, 401)
+        self.client.force_login(self.reader)
+        response = self.post_json(url, data)
+        self.assertEqual(response.status_code, 201)
+        created = response.json()
+        self.assertEqual(created['group'], 'group')
+        self.assertEqual(response['Location'],
+                         reverse('api:post', args=[created['id']]))
+
+    def test_create_post_errors(self):
+        self.client.force_login(self.reader)
+        response = self.post_json(reverse('api:posts'),
+                                  {'text': '', 'group': 'none'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()['errors']), {'text', 'group'})
+
+    def test_edit_post_by_author_only(self):
+        url = reverse('api:post', args=[self.post.pk])
+        self.client.force_login(self.reader)
+        self.assertEqual(
+            self.post_json(url, {'text': 'Чужой'}, 'patch').status_code, 403)
+        self.client.force_login(self.author)
+        response = self.post_json(url, {'text': 'Правка'}, 'patch')
+        self.assertEqual(response.json()['text'], 'Правка')
+        self.assertEqual(response.json()['group'], 'group')
+
+    def test_add_comment(self):
+        self.client.force_login(self.reader)
+        response = self.post_json(
+            reverse('api:comments', args=[self.post.pk]), {'text': 'Ещё'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.post.comments.count(), 2)
+
+    def test_follow_and_unfollow(self):
+        url = reverse('api:follow', args=['reader'])
+        self.client.force_login(self.author)
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertTrue(Follow.objects.filter(user=self.author,
+                                              author=self.reader).exists())
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertFalse(Follow.objects.filter(user=self.author,
+                                               author=self.reader).exists())
+        self_follow = self.client.post(
+            reverse('api:follow', args=['author']))
+        self.assertEqual(self_follow.status_code, 400)
+
+
+class ApiAuthTest(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = Client(enforce_csrf_checks=True)
+
+    def test_session_write_without_csrf_token(self):
+        """Отказ CSRF приходит JSON-ошибкой, а не HTML-страницей."""
+        self.client.force_login(self.reader)
+        response = self.post_json(
+            reverse('api:comments', args=[self.post.pk]), {'text': 'Ещё'})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn('CSRF', response.json()['error'])
+
+    def test_token_writes_without_csrf(self):
+        self.reader.set_password('secret-password')
+        self.reader.save()
+        response = self.post_json(reverse('api:token'), {
+            'username': 'reader', 'password': 'secret-password'})
+        key = response.json()['token']
+        self.assertEqual(Token.objects.get(user=self.reader).key, key)
+        response = self.client.post(
+            reverse('api:comments', args=[self.post.pk]),
+            json.dumps({'text': 'С токеном'}),
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Token {key}')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['author'], 'reader')
+        response = self.client.delete(reverse('api:token'),
+                                      HTTP_AUTHORIZATION=f'Token {key}')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Token.objects.exists())
+
+    def test_bad_credentials(self):
+        response = self.post_json(reverse('api:token'), {
+            'username': 'reader', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 401)
+        response = self.client.get(reverse('api:posts'),
+                                   HTTP_AUTHORIZATION='Token unknown')
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,342 @@
+"""JSON API лент, постов, комментариев и подписок.
+
+Ответы собираются из строк ``.values()`` (см. ``serializers``), списки
+листаются курсором. GET-ответы несут ETag и Last-Modified, посчитанные
+по поколениям posts.caching до запросов к лентам, поэтому повторный
+запрос без изменений получает 304, не трогая ленту.
+"""
+import json
+from functools import wraps
+
+from django.contrib.auth import authenticate, get_user_model
+from django.db import transaction
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from core.db.routers import read_replica
+from core.paginator import ValuesCursorPaginator
+from posts import caching, follows, timeline, uploadhandlers
+from posts.conditional import respond
+from posts.forms import CommentForm, PostForm
+from posts.models import Comment, Group, Post
+from posts.views import NUM_COMMENTS, NUM_POST
+
+from . import authentication
+from .models import Token
+from .serializers import COMMENT, POST, POST_DETAIL, PROFILE, FieldError
+
+User = get_user_model()
+
+
+def error(message, status=400, **extra):
+    return JsonResponse({'error': message, **extra}, status=status)
+
+
+def _authenticate(request):
+    """Пользователь по токену или CSRF для сессии; ответ с ошибкой."""
+    try:
+        user = authentication.token_user(request)
+    except authentication.InvalidToken:
+        return error('Неверный токен.', status=401)
+    if user is not None:
+        request.user = user
+        return None
+    reason = authentication.csrf_failure(request)
+    if reason is not None:
+        return error(f'Ошибка CSRF: {reason}', status=403)
+    return None
+
+
+def api_view(methods, uploads=False):
+    """Допустимые методы, авторизация и ошибки API в виде JSON.
+
+    CSRF проверяет ``authentication``, а не middleware: отказ приходит
+    JSON-ошибкой 403, а клиенты с токеном обходятся без CSRF-токена.
+    ``uploads`` ограничивает загружаемые картинки, как в постах сайта.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @require_http_methods(methods)
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if uploads:
+                uploadhandlers.bound_uploads(request)
+            refusal = _authenticate(request)
+            if refusal is not None:
+                return refusal
+            try:
+                return view(request, *args, **kwargs)
+            except FieldError as exc:
+                return error(str(exc))
+            except Http404:
+                return error('Не найдено.', status=404)
+        return wrapper
+    return decorator
+
+
+def login_required(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error('Требуется вход.', status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def request_data(request):
+    """Данные формы из JSON-тела или обычного POST."""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+def _link(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return f'{request.path}?{params.urlencode()}'
+
+
+def listing(request, current, results):
+    """Ответ со страницей ``current``: результаты и соседние страницы."""
+    return JsonResponse({
+        'results': results,
+        'next': _link(request, current.next_cursor),
+        'previous': _link(request, current.previous_cursor),
+    })
+
+
+def page(request, queryset, serializer, per_page=NUM_POST,
+         key='pub_date', descending=True):
+    """Страница списка: результаты и ссылки на соседние страницы."""
+    names = serializer.select(request.GET.get('fields'))
+    rows = queryset.values(
+        *dict.fromkeys([*serializer.lookups(names), 'pk', key]))
+    paginator = ValuesCursorPaginator(rows, per_page, key=key,
+                                      descending=descending)
+    current = paginator.cursor_page(request.GET.get('cursor'))
+    return listing(request, current, serializer.dump(current, names))
+
+
+def record(request, queryset, serializer):
+    """Словарь ответа для единственного объекта ``queryset``."""
+    names = serializer.select(request.GET.get('fields'))
+    row = queryset.values(*serializer.lookups(names)).first()
+    if row is None:
+        raise Http404
+    return serializer.dump([row], names)[0]
+
+
+def one(request, queryset, serializer, status=200, **headers):
+    response = JsonResponse(record(request, queryset, serializer),
+                            status=status)
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def _post_form(request, data, instance=None):
+    """PostForm, у которой группа задаётся slug, как в ответах API."""
+    form = PostForm(
+        data,
+        files=request.FILES or None,
+        instance=instance,
+        upload_errors=getattr(request, 'upload_errors', None),
+    )
+    form.fields['group'].to_field_name = 'slug'
+    return form
+
+
+def _saved_post(request, form, status):
+    if not form.is_valid():
+        return error('Ошибка в данных.', errors=form.errors)
+    post = form.save(commit=False)
+    post.author = request.user
+    post.save()
+    location = reverse('api:post', args=[post.pk])
+    return one(request, Post.objects.filter(pk=post.pk), POST_DETAIL,
+               status=status, Location=location)
+
+
+@api_view(['GET', 'HEAD', 'POST'], uploads=True)
+@read_replica
+def posts(request):
+    """Лента всех постов; POST публикует новый пост."""
+    if request.method == 'POST':
+        return create_post(request)
+    return respond(request, [caching.ALL_POSTS], lambda: page(
+        request, Post.objects.all(), POST))
+
+
+@login_required
+@transaction.atomic
+def create_post(request):
+    data = request_data(request)
+    if data is None:
+        return error('Тело запроса — не объект JSON.')
+    return _saved_post(request, _post_form(request, data), status=201)
+
+
+@api_view(['GET', 'HEAD', 'PATCH'], uploads=True)
+@read_replica
+def post(request, post_id):
+    """Отдельный пост; PATCH (JSON) меняет его текст или группу."""
+    if request.method == 'PATCH':
+        return edit_post(request, post_id)
+    return respond(
+        request, [caching.post_scope(post_id)],
+        lambda: one(request, Post.objects.filter(pk=post_id), POST_DETAIL))
+
+
+@login_required
+@transaction.atomic
+def edit_post(request, post_id):
+    instance = get_object_or_404(Post, pk=post_id)
+    if instance.author_id != request.user.pk:
+        return error('Пост может менять только автор.', status=403)
+    data = request_data(request)
+    if data is None:
+        return error('Тело запроса — не объект JSON.')
+    group = instance.group.slug if instance.group_id else None
+    data = {'text': instance.text, 'group': group, **data}
+    return _saved_post(request, _post_form(request, data, instance),
+                       status=200)
+
+
+@api_view(['GET', 'HEAD'])
+@read_replica
+def group_posts(request, slug):
+    group_id = get_object_or_404(
+        Group.objects.values_list('pk', flat=True), slug=slug)
+    return respond(request, [caching.group_scope(group_id)], lambda: page(
+        request, Post.objects.filter(group_id=group_id), POST))
+
+
+@api_view(['GET', 'HEAD'])
+@read_replica
+def profile(request, username):
+    """Автор со счётчиками и признаком подписки текущего пользователя.
+
+    Счётчики меняются без смены поколений, поэтому ответ без ETag.
+    """
+    users = User.objects.filter(username=username)
+    data = record(request, users, PROFILE)
+    if request.user.is_authenticated:
+        author_id = users.values_list('pk', flat=True).get()
+        data['following'] = follows.is_following(request.user.pk, author_id)
+        data['mutual'] = follows.is_mutual(request.user.pk, author_id)
+    response = JsonResponse(data)
+    patch_cache_control(response, no_cache=True, private=True)
+    return response
+
+
+@api_view(['GET', 'HEAD'])
+@read_replica
+def profile_posts(request, username):
+    author_id = get_object_or_404(
+        User.objects.values_list('pk', flat=True), username=username)
+    return respond(
+        request, [caching.author_scope(author_id)],
+        lambda: page(request, Post.objects.filter(author_id=author_id), POST))
+
+
+@api_view(['GET', 'HEAD', 'POST'])
+@read_replica
+def comments(request, post_id):
+    """Комментарии поста от старых к новым; POST добавляет комментарий."""
+    if request.method == 'POST':
+        return add_comment(request, post_id)
+
+    def build():
+        # Внутри build: ответ 304 по-прежнему обходится без запросов.
+        if not Post.objects.filter(pk=post_id).exists():
+            raise Http404
+        thread = Comment.objects.filter(post_id=post_id).order_by('created')
+        return page(request, thread, COMMENT, per_page=NUM_COMMENTS,
+                    key='created', descending=False)
+    return respond(request, [caching.post_scope(post_id)], build)
+
+
+@login_required
+@transaction.atomic
+def add_comment(request, post_id):
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    data = request_data(request)
+    if data is None:
+        return error('Тело запроса — не объект JSON.')
+    form = CommentForm(data)
+    if not form.is_valid():
+        return error('Ошибка в данных.', errors=form.errors)
+    comment = form.save(commit=False)
+    comment.author = request.user
+    comment.post_id = post_id
+    comment.save()
+    return one(request, Comment.objects.filter(pk=comment.pk), COMMENT,
+               status=201)
+
+
+@api_view(['GET', 'HEAD'])
+@login_required
+@read_replica
+def follow_index(request):
+    """Лента постов авторов, на которых подписан пользователь."""
+    def build():
+        names = POST.select(request.GET.get('fields'))
+        current = timeline.TimelinePaginator(
+            request.user, NUM_POST).cursor_page(request.GET.get('cursor'))
+        ids = [post.pk for post in current]
+        rows = {
+            row['pk']: row for row in Post.objects.filter(pk__in=ids)
+            .values(*dict.fromkeys([*POST.lookups(names), 'pk']))
+        }
+        return listing(request, current,
+                       POST.dump([rows[pk] for pk in ids], names))
+    return respond(
+        request,
+        [caching.ALL_POSTS, caching.follow_scope(request.user.pk)],
+        build, personal=True)
+
+
+@api_view(['POST', 'DELETE'])
+@login_required
+@transaction.atomic
+def follow(request, username):
+    """POST подписывает на автора, DELETE отписывает."""
+    author = get_object_or_404(User, username=username)
+    if request.method == 'DELETE':
+        follows.unfollow(request.user.pk, author.pk)
+        return HttpResponse(status=204)
+    if author == request.user:
+        return error('Нельзя подписаться на себя.')
+    created = follows.follow(request.user.pk, author.pk)
+    return JsonResponse({'author': author.username, 'following': True},
+                        status=201 if created else 200)
+
+
+@api_view(['POST', 'DELETE'])
+@transaction.atomic
+def token(request):
+    """POST с именем и паролем выдаёт токен API, DELETE отзывает его."""
+    if request.method == 'DELETE':
+        if not request.user.is_authenticated:
+            return error('Требуется вход.', status=401)
+        Token.objects.filter(user=request.user).delete()
+        return HttpResponse(status=204)
+    data = request_data(request)
+    if data is None:
+        return error('Тело запроса — не объект JSON.')
+    user = authenticate(request, username=data.get('username'),
+                        password=data.get('password'))
+    if user is None:
+        return error('Неверное имя пользователя или пароль.', status=401)
+    api_token, _ = Token.objects.get_or_create(user=user)
+    return JsonResponse({'token': api_token.key})
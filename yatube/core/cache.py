@@ -0,0 +1,92 @@
+"""Кэш с защитой от лавины запросов (cache stampede).
+
+Значение хранится вместе со сроком свежести и временем построения.
+Пересчитывает его только тот, кто взял блокировку, остальные в это время
+получают устаревшее значение (stale-while-revalidate) или ждут первого
+построения. Незадолго до истечения срока значение с растущей
+вероятностью пересчитывается заранее (probabilistic early expiration),
+чтобы ключи горячих страниц не истекали у всех воркеров одновременно.
+
+Значение, при построении которого читались реплики или другое такое же
+значение, свежо не дольше REPLICA_CACHE_SECONDS: реплика могла отставать,
+а ключ сменится только со следующей записью.
+"""
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.db import routers
+
+STALE_TIMEOUT = 5 * 60
+LOCK_TIMEOUT = 30
+LOCK_WAIT = 2
+LOCK_POLL = 0.05
+BETA = 1.0
+
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+
+def _is_fresh(expires_at, delta, beta):
+    # XFetch: чем дороже построение и ближе срок, тем вероятнее пересчёт.
+    # random() бывает равен 0.0, а логарифм нуля не определён.
+    draw = 1.0 - random.random()
+    return time.time() - delta * beta * math.log(draw) < expires_at
+
+
+def _value(entry):
+    # Значение с реплики делает таким же и значение, которое из него строят.
+    if entry[3:] == (True,):
+        routers.mark_replica()
+    return entry[0]
+
+
+def _build(key, build, timeout, stale_timeout):
+    hits = routers.replica_hits()
+    started = time.time()
+    value = build()
+    delta = time.time() - started
+    replica = routers.replica_hits() > hits
+    if replica:
+        timeout = min(timeout, settings.REPLICA_CACHE_SECONDS)
+    cache.set(key, (value, time.time() + timeout, delta, replica),
+              timeout + stale_timeout)
+    return value
+
+
+def _build_locked(key, build, timeout, stale_timeout):
+    try:
+        return _build(key, build, timeout, stale_timeout)
+    finally:
+        cache.delete(_lock_key(key))
+
+
+def get_or_build(key, build, timeout, stale_timeout=STALE_TIMEOUT,
+                 beta=BETA):
+    """Возвращает значение ключа, строя его ``build()`` не более одного раза.
+
+    ``timeout`` — сколько значение считается свежим, ``stale_timeout`` —
+    сколько ещё его можно отдавать, пока другой процесс пересчитывает.
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        expires_at, delta = entry[1:3]
+        if _is_fresh(expires_at, delta, beta):
+            return _value(entry)
+        if not cache.add(_lock_key(key), True, LOCK_TIMEOUT):
+            return _value(entry)
+        return _build_locked(key, build, timeout, stale_timeout)
+
+    if cache.add(_lock_key(key), True, LOCK_TIMEOUT):
+        return _build_locked(key, build, timeout, stale_timeout)
+    deadline = time.time() + LOCK_WAIT
+    while time.time() < deadline:
+        time.sleep(LOCK_POLL)
+        entry = cache.get(key)
+        if entry is not None:
+            return _value(entry)
+    return _build(key, build, timeout, stale_timeout)
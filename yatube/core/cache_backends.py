@@ -0,0 +1,274 @@
+"""Бэкенды кэша со статистикой попаданий и промахов.
+
+``SQLiteCache`` хранит записи в одном файле SQLite в режиме WAL: кэш
+общий для всех процессов на узле и не требует отдельного сервиса.
+``add`` и ``incr`` выполняются в одной транзакции, поэтому на них можно
+строить блокировки и счётчики поколений. ``add`` в ``FileBasedCache``
+тоже атомарен, а ``incr`` в нём, как и у Django, — нет.
+"""
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends import filebased, locmem
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from core import metrics
+
+MISSING = object()
+
+
+@contextmanager
+def _transaction(connection):
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        yield
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+
+class StatsMixin:
+    """Считает попадания и промахи кэша в текущем процессе."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def record(self, hits=0, misses=0):
+        with self._stats_lock:
+            self._hits += hits
+            self._misses += misses
+        metrics.record_cache(hits, misses)
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, MISSING, version)
+        if value is MISSING:
+            self.record(misses=1)
+            return default
+        self.record(hits=1)
+        return value
+
+    def stats(self):
+        with self._stats_lock:
+            hits, misses = self._hits, self._misses
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / total if total else 0.0,
+        }
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._hits = self._misses = 0
+
+
+class LocMemCache(StatsMixin, locmem.LocMemCache):
+    pass
+
+
+class FileBasedCache(StatsMixin, filebased.FileBasedCache):
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        """Атомарный ``add``: на нём держатся блокировки ``core.cache``.
+
+        У Django ``add`` — это ``has_key`` и затем ``set``, и ключ могут
+        занять несколько процессов сразу. Здесь запись готовится во
+        временном файле и ставится на место ``os.link``, который, как
+        открытие с O_EXCL, не заменяет существующий файл. Пустой файл
+        от O_EXCL ``has_key`` другого процесса счёл бы устаревшим и удалил.
+        """
+        if self.has_key(key, version):
+            return False
+        self._createdir()
+        fname = self._key_to_file(key, version)
+        self._cull()
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, 'wb') as f:
+                self._write_content(f, timeout, value)
+            os.link(tmp_path, fname)
+        except FileExistsError:
+            return False
+        finally:
+            os.remove(tmp_path)
+        return True
+
+
+class SQLiteCache(StatsMixin, BaseCache):
+    cull_every = 100
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        self._sets = 0
+
+    def _connection(self):
+        # Соединение своё у каждого потока и у каждого процесса после fork.
+        pid, connection = getattr(self._local, 'connection', (None, None))
+        if connection is None or pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache_entries ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS cache_entries_expires '
+                'ON cache_entries (expires)'
+            )
+            self._local.connection = (os.getpid(), connection)
+        return connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    @staticmethod
+    def _alive(expires):
+        return expires is None or expires > time.time()
+
+    @staticmethod
+    def _dumps(value):
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def _read(self, connection, key):
+        row = connection.execute(
+            'SELECT value, expires FROM cache_entries WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or not self._alive(row[1]):
+            return MISSING
+        return pickle.loads(row[0])
+
+    def get(self, key, default=None, version=None):
+        value = self._read(self._connection(), self._key(key, version))
+        if value is MISSING:
+            self.record(misses=1)
+            return default
+        self.record(hits=1)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        originals = {self._key(key, version): key for key in keys}
+        placeholders = ', '.join('?' * len(originals))
+        rows = self._connection().execute(
+            'SELECT key, value, expires FROM cache_entries '
+            f'WHERE key IN ({placeholders})', list(originals)
+        ).fetchall()
+        found = {
+            originals[key]: pickle.loads(value)
+            for key, value, expires in rows if self._alive(expires)
+        }
+        self.record(hits=len(found), misses=len(keys) - len(found))
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._connection().execute(
+            'INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?)',
+            (self._key(key, version), self._dumps(value),
+             self.get_backend_timeout(timeout)),
+        )
+        self._maybe_cull()
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        rows = [(self._key(key, version), self._dumps(value), expires)
+                for key, value in data.items()]
+        connection = self._connection()
+        with _transaction(connection):
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?)', rows)
+        self._maybe_cull()
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        with _transaction(connection):
+            connection.execute(
+                'DELETE FROM cache_entries WHERE key = ? AND expires <= ?',
+                (key, time.time()),
+            )
+            cursor = connection.execute(
+                'INSERT OR IGNORE INTO cache_entries VALUES (?, ?, ?)',
+                (key, self._dumps(value), self.get_backend_timeout(timeout)),
+            )
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        with _transaction(connection):
+            value = self._read(connection, key)
+            if value is MISSING:
+                raise ValueError(f"Key '{key}' not found")
+            value += delta
+            connection.execute(
+                'UPDATE cache_entries SET value = ? WHERE key = ?',
+                (self._dumps(value), key),
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self._connection().execute(
+            'UPDATE cache_entries SET expires = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), self._key(key, version),
+             time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        return self._read(
+            self._connection(), self._key(key, version)) is not MISSING
+
+    def delete(self, key, version=None):
+        self._connection().execute(
+            'DELETE FROM cache_entries WHERE key = ?',
+            (self._key(key, version),),
+        )
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache_entries')
+
+    def close(self, **kwargs):
+        # Соединение живёт весь процесс и не закрывается после запроса.
+        pass
+
+    def _maybe_cull(self):
+        self._sets += 1
+        if self._sets % self.cull_every:
+            return
+        connection = self._connection()
+        connection.execute(
+            'DELETE FROM cache_entries WHERE expires <= ?', (time.time(),))
+        count = connection.execute(
+            'SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            self.clear()
+            return
+        connection.execute(
+            'DELETE FROM cache_entries WHERE key IN ('
+            'SELECT key FROM cache_entries '
+            'ORDER BY expires IS NULL, expires LIMIT ?)',
+            (count // self._cull_frequency,),
+        )
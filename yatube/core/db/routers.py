@@ -0,0 +1,90 @@
+"""Чтение с реплик базы данных для страниц, которые ничего не пишут.
+
+Запросы идут на реплики из DATABASE_REPLICAS только внутри view,
+обёрнутых ``read_replica``; всё остальное читает и пишет в ``default``.
+После записи чтения в том же запросе возвращаются на основную базу, а
+``PrimaryStickyMiddleware`` ставит cookie, и следующие
+REPLICA_STICKY_SECONDS секунд пользователь читает только с основной
+базы, чтобы сразу видеть свои изменения несмотря на отставание реплик.
+Чтения с реплик считаются, чтобы кэш не хранил долго то, что могло
+быть прочитано с отстающей реплики.
+"""
+import random
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+PRIMARY = 'default'
+STICKY_COOKIE = 'use_primary'
+
+_state = threading.local()
+
+
+def replica_allowed():
+    return (getattr(_state, 'replica', False)
+            and not getattr(_state, 'wrote', False))
+
+
+def reset_writes():
+    _state.wrote = False
+
+
+def wrote():
+    return getattr(_state, 'wrote', False)
+
+
+def replica_hits():
+    """Сколько раз поток читал с реплик; растёт и через ``mark_replica``."""
+    return getattr(_state, 'replica_hits', 0)
+
+
+def mark_replica():
+    _state.replica_hits = replica_hits() + 1
+
+
+@contextmanager
+def replica_reads():
+    previous = getattr(_state, 'replica', False)
+    _state.replica = True
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+def read_replica(view):
+    """Читает данные view с реплики, если пользователь недавно не писал.
+
+    Пишущие запросы (не GET и не HEAD) всегда читают с основной базы.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (STICKY_COOKIE in request.COOKIES
+                or request.method not in ('GET', 'HEAD')):
+            return view(request, *args, **kwargs)
+        with replica_reads():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if settings.DATABASE_REPLICAS and replica_allowed():
+            mark_replica()
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик повторяет основную базу вместе с данными.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
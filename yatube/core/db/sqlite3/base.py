@@ -0,0 +1,48 @@
+"""SQLite с настройками для конкурентной нагрузки.
+
+Каждое новое соединение включает WAL (читатели не блокируют писателя),
+``synchronous=NORMAL``, отображение файла в память, увеличенный кэш
+страниц и ожидание занятой базы. Значения PRAGMA по умолчанию можно
+переопределить в ``DATABASES[...]['OPTIONS']['pragmas']``, а
+``CONN_MAX_AGE`` оставляет соединение открытым между запросами.
+"""
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — размер в килобайтах, а не в страницах.
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+NAME = re.compile(r'^[a-z_]+$')
+VALUE = re.compile(r'^-?\w+$')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        return params
+
+    def get_pragmas(self):
+        pragmas = {
+            **PRAGMAS,
+            **self.settings_dict['OPTIONS'].get('pragmas', {}),
+        }
+        for name, value in pragmas.items():
+            if not NAME.match(name) or not VALUE.match(str(value)):
+                raise ImproperlyConfigured(
+                    f'Недопустимая настройка SQLite: {name}={value!r}')
+        return pragmas
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.get_pragmas().items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
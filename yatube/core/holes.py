@@ -0,0 +1,35 @@
+"""Дырки в общих для всех читателей страницах, в духе Edge Side Includes.
+
+Тег ``{% hole %}`` вместо фрагмента, который зависит от пользователя,
+выводит метку с именем шаблона и его аргументами. Страница с метками
+одинакова для всех и кэшируется целиком, а ``HoleMiddleware`` в каждом
+ответе рендерит на месте меток фрагменты для текущего запроса. Метки
+подписаны: текст из базы не может подложить свой шаблон.
+"""
+import re
+
+from django.core import signing
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+MARKER = '<!--hole:'
+SALT = 'core.holes'
+_HOLE = re.compile(r'<!--hole:(.*?)-->')
+
+
+def placeholder(template_name, arguments):
+    """Метка фрагмента; аргументы должны сериализоваться в JSON."""
+    value = signing.dumps([template_name, arguments], salt=SALT)
+    return mark_safe(f'{MARKER}{value}-->')
+
+
+def punch(content, request):
+    """Текст страницы с фрагментами на месте меток."""
+    def fill(match):
+        try:
+            template_name, arguments = signing.loads(match.group(1),
+                                                     salt=SALT)
+        except signing.BadSignature:
+            return ''
+        return render_to_string(template_name, arguments, request=request)
+    return _HOLE.sub(fill, content)
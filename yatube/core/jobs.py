@@ -0,0 +1,176 @@
+"""Очередь фоновых задач в таблице ``core.Job``.
+
+Задача — функция с декоратором ``@task``. Вызов ``.delay(*args)`` после
+фиксации транзакции (``transaction.on_commit``) добавляет в таблицу
+строку с именем задачи и аргументами в JSON, поэтому воркер не увидит
+задачу раньше данных, ради которых она поставлена, а откат транзакции
+её отменяет. Воркеры ``manage.py run_workers`` забирают готовые задачи
+по приоритету: строка захватывается условным UPDATE, что работает и в
+SQLite без SELECT ... FOR UPDATE. Неудачная попытка повторяется с
+удваивающейся задержкой, после JOBS_MAX_ATTEMPTS попыток задача
+остаётся в таблице со статусом failed и текстом ошибки.
+
+При JOBS_EAGER задачи выполняются сразу в вызывающем коде — так в
+тестах и при разработке без воркеров.
+"""
+import json
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+from functools import update_wrapper
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+CLAIM_BATCH = 10
+
+_tasks = {}
+
+
+class Task:
+    def __init__(self, func, priority, max_attempts):
+        update_wrapper(self, func)
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.priority = priority
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+    def delay(self, *args):
+        """Ставит задачу в очередь после фиксации текущей транзакции."""
+        if settings.JOBS_EAGER:
+            self.run_eagerly(args)
+            return
+        transaction.on_commit(lambda: enqueue(self, *args))
+
+    def run_eagerly(self, args):
+        # Как у воркера: ошибка задачи откатывает только её и не
+        # прерывает код, который её поставил.
+        try:
+            with transaction.atomic():
+                self.func(*args)
+        except Exception:
+            logger.exception('Задача %s%r упала', self.name, args)
+
+
+def task(priority=0, max_attempts=None):
+    """Регистрирует функцию как задачу; больший приоритет — раньше.
+
+    Аргументы задачи должны сериализоваться в JSON.
+    """
+    def decorator(func):
+        registered = Task(func, priority, max_attempts)
+        _tasks[registered.name] = registered
+        return registered
+    return decorator
+
+
+def get_task(name):
+    if name not in _tasks:
+        autodiscover_modules('tasks')
+    return _tasks[name]
+
+
+def enqueue(registered, *args):
+    return Job.objects.create(
+        name=registered.name,
+        arguments=json.dumps(args),
+        priority=registered.priority,
+        max_attempts=registered.max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+
+
+def claim(worker):
+    """Захватывает готовую задачу с наибольшим приоритетом или None."""
+    now = timezone.now()
+    ready = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).order_by(
+        '-priority', 'run_at', 'pk').values_list('pk', flat=True)
+    for pk in ready[:CLAIM_BATCH]:
+        # Другой воркер мог успеть раньше: тогда строка уже не queued.
+        if Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+                status=Job.RUNNING, locked_at=now, locked_by=worker,
+                attempts=F('attempts') + 1):
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def _fail(job, error):
+    queryset = Job.objects.filter(pk=job.pk)
+    if job.attempts >= job.max_attempts:
+        logger.error('Задача %s не выполнена за %d попыток:\n%s',
+                     job, job.attempts, error)
+        queryset.update(status=Job.FAILED, last_error=error)
+        return
+    delay = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+    logger.warning('Задача %s упала, повтор через %d с:\n%s',
+                   job, delay, error)
+    queryset.update(status=Job.QUEUED, locked_at=None, locked_by='',
+                    last_error=error,
+                    run_at=timezone.now() + timedelta(seconds=delay))
+
+
+def execute(job):
+    """Выполняет захваченную задачу; True, если она удалась."""
+    try:
+        registered = get_task(job.name)
+        with transaction.atomic():
+            # Удаление первым запросом сразу берёт блокировку на запись:
+            # в SQLite транзакция, начатая чтением, не может стать пишущей,
+            # пока пишет другой воркер, и падает, не дожидаясь busy_timeout.
+            # Задача исчезает из очереди вместе с фиксацией своей работы.
+            Job.objects.filter(pk=job.pk).delete()
+            registered.func(*json.loads(job.arguments))
+    except Exception:
+        _fail(job, traceback.format_exc())
+        return False
+    return True
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи воркеров, умерших посреди работы.
+
+    Задача, исчерпавшая попытки, считается невыполнимой: вероятно, она
+    сама и роняет воркер.
+    """
+    deadline = timezone.now() - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=deadline)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, last_error='Воркер не завершил задачу.')
+    return stale.update(status=Job.QUEUED, locked_at=None, locked_by='')
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def work(stop=None, burst=False, poll=None):
+    """Выполняет задачи, пока не выставлено событие ``stop``.
+
+    ``burst`` — выйти, как только готовых задач не останется. Возвращает
+    число выполненных задач.
+    """
+    poll = settings.JOBS_POLL_SECONDS if poll is None else poll
+    worker = worker_name()
+    done = 0
+    while stop is None or not stop.is_set():
+        close_old_connections()
+        job = claim(worker)
+        if job is not None:
+            done += execute(job)
+            continue
+        if burst or stop is None:
+            break
+        requeue_stale()
+        stop.wait(poll)
+    return done
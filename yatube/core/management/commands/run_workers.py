@@ -0,0 +1,56 @@
+import multiprocessing
+import os
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+
+
+def _work(stop, burst, poll):
+    # При spawn (macOS, Windows) дочерний процесс начинает с чистого листа.
+    import django
+    django.setup()
+    # Ctrl-C получает вся группа процессов; останавливает воркеры родитель.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    jobs.work(stop=stop, burst=burst, poll=poll)
+
+
+class Command(BaseCommand):
+    help = ('Запускает процессы, выполняющие фоновые задачи core.jobs. '
+            'SIGINT или SIGTERM дают воркерам закончить текущую задачу.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int,
+                            default=os.cpu_count() or 1)
+        parser.add_argument('--poll', type=float,
+                            default=settings.JOBS_POLL_SECONDS,
+                            help='Пауза в секундах, когда задач нет.')
+        parser.add_argument('--burst', action='store_true',
+                            help='Выйти, когда готовых задач не останется.')
+
+    def handle(self, *args, processes, poll, burst, **options):
+        if settings.JOBS_EAGER:
+            self.stderr.write(
+                'JOBS_EAGER включён: '
+                'сайт выполняет задачи сам, новых задач в очереди не будет.')
+        jobs.requeue_stale()
+        # Соединения с базой нельзя делить с дочерними процессами.
+        connections.close_all()
+        stop = multiprocessing.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+        workers = [
+            multiprocessing.Process(target=_work, args=(stop, burst, poll),
+                                    name=f'jobs-worker-{number}')
+            for number in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f'Воркеров запущено: {processes}')
+        for worker in workers:
+            worker.join()
+        self.stdout.write(self.style.SUCCESS('Воркеры остановлены.'))
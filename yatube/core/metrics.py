@@ -0,0 +1,189 @@
+"""Метрики производительности запросов в формате Prometheus.
+
+Замеры текущего запроса копятся в ``RequestMetrics`` потока, а по
+окончании запроса попадают в гистограммы процесса с меткой имени view.
+Каждый процесс сервера отдаёт свои гистограммы; складывает их сборщик
+Prometheus.
+"""
+import bisect
+import threading
+import tracemalloc
+from time import perf_counter
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+MEMORY_BUCKETS = tuple(2 ** power * 1024 for power in range(4, 16, 2))
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.memory_peak = None
+
+    @property
+    def duration(self):
+        return perf_counter() - self.started
+
+
+def reset_memory_peak():
+    """Начинает новый замер пика памяти tracemalloc.
+
+    ``reset_peak`` есть только с Python 3.9; раньше пик сбрасывается
+    вместе со следами выделений, и память считается заново с нуля.
+    """
+    reset_peak = getattr(tracemalloc, 'reset_peak', None)
+    if reset_peak is not None:
+        reset_peak()
+    else:
+        tracemalloc.clear_traces()
+
+
+def start_request():
+    _local.current = RequestMetrics()
+    return _local.current
+
+
+def finish_request():
+    current = getattr(_local, 'current', None)
+    _local.current = None
+    return current
+
+
+def current():
+    return getattr(_local, 'current', None)
+
+
+def record_query(elapsed):
+    metrics = current()
+    if metrics is not None:
+        metrics.queries += 1
+        metrics.db_time += elapsed
+
+
+def record_template(elapsed):
+    metrics = current()
+    if metrics is not None:
+        metrics.template_time += elapsed
+
+
+def record_cache(hits=0, misses=0):
+    metrics = current()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+def query_timer(execute, sql, params, many, context):
+    """Обёртка для ``connection.execute_wrapper``: считает запросы."""
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record_query(perf_counter() - started)
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, label, value):
+        counts, total = self.series.get(label, (None, 0))
+        if counts is None:
+            counts = [0] * (len(self.buckets) + 1)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.series[label] = (counts, total + value)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}',
+                 f'# TYPE {self.name} histogram']
+        for label, (counts, total) in sorted(self.series.items()):
+            view = _escape(label)
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{view="{view}",'
+                             f'le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(
+                f'{self.name}_bucket{{view="{view}",le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{view="{view}"}} {total}')
+            lines.append(f'{self.name}_count{{view="{view}"}} {cumulative}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.series = {}
+
+    def inc(self, label, value):
+        self.series[label] = self.series.get(label, 0) + value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}',
+                 f'# TYPE {self.name} counter']
+        for label, value in sorted(self.series.items()):
+            lines.append(f'{self.name}{{view="{_escape(label)}"}} {value}')
+        return lines
+
+
+def _escape(value):
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.duration = Histogram(
+            'yatube_request_duration_seconds', 'Время ответа.',
+            DURATION_BUCKETS)
+        self.db_duration = Histogram(
+            'yatube_db_duration_seconds', 'Время запросов к базе за ответ.',
+            DURATION_BUCKETS)
+        self.queries = Histogram(
+            'yatube_db_queries', 'Число запросов к базе за ответ.',
+            QUERY_BUCKETS)
+        self.template_duration = Histogram(
+            'yatube_template_duration_seconds', 'Время рендера шаблонов.',
+            DURATION_BUCKETS)
+        self.memory = Histogram(
+            'yatube_memory_peak_bytes', 'Пик выделенной за ответ памяти.',
+            MEMORY_BUCKETS)
+        self.cache_hits = Counter(
+            'yatube_cache_hits_total', 'Попадания в кэш.')
+        self.cache_misses = Counter(
+            'yatube_cache_misses_total', 'Промахи кэша.')
+
+    def observe(self, view, metrics):
+        with self.lock:
+            self.duration.observe(view, metrics.duration)
+            self.db_duration.observe(view, metrics.db_time)
+            self.queries.observe(view, metrics.queries)
+            self.template_duration.observe(view, metrics.template_time)
+            if metrics.memory_peak is not None:
+                self.memory.observe(view, metrics.memory_peak)
+            self.cache_hits.inc(view, metrics.cache_hits)
+            self.cache_misses.inc(view, metrics.cache_misses)
+
+    def render(self):
+        with self.lock:
+            lines = []
+            for metric in (self.duration, self.db_duration, self.queries,
+                           self.template_duration, self.memory,
+                           self.cache_hits, self.cache_misses):
+                lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
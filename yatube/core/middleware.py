@@ -0,0 +1,127 @@
+import random
+import tracemalloc
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from core import holes, metrics, queries
+from core.db import routers
+
+UNRESOLVED = '<unresolved>'
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else UNRESOLVED
+
+
+class PerformanceMiddleware:
+    """Замеряет запрос и отдаёт замеры в Server-Timing и ``core.metrics``."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.trace_memory = settings.PERF_TRACE_MEMORY
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def __call__(self, request):
+        current = metrics.start_request()
+        if self.trace_memory:
+            metrics.reset_memory_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.query_timer))
+                response = self.get_response(request)
+        finally:
+            metrics.finish_request()
+        if self.trace_memory:
+            current.memory_peak = max(
+                0, tracemalloc.get_traced_memory()[1] - baseline)
+        metrics.registry.observe(view_name(request), current)
+        response['Server-Timing'] = self.server_timing(current)
+        return response
+
+    @staticmethod
+    def server_timing(current):
+        return ', '.join((
+            f'total;dur={current.duration * 1000:.1f}',
+            f'db;dur={current.db_time * 1000:.1f};'
+            f'desc="{current.queries} queries"',
+            f'tpl;dur={current.template_time * 1000:.1f}',
+            f'cache;desc="{current.cache_hits} hits, '
+            f'{current.cache_misses} misses"',
+        ))
+
+
+class QueryInspectorMiddleware:
+    """Ищет N+1 и медленные запросы в доле QUERY_INSPECTOR_SAMPLE_RATE ответов.
+
+    View, превысившие бюджет из QUERY_BUDGETS, попадают в лог, а при
+    QUERY_BUDGET_STRICT запрос завершается ошибкой — так бюджет
+    проверяется в тестах.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.QUERY_INSPECTOR_SAMPLE_RATE:
+            return self.get_response(request)
+        inspector = queries.QueryInspector()
+        with inspector.install():
+            response = self.get_response(request)
+        view = view_name(request)
+        inspector.report(view)
+        budget = settings.QUERY_BUDGETS.get(view)
+        if budget is not None and inspector.total > budget:
+            message = (f'{view}: {inspector.total} запросов при бюджете '
+                       f'{budget}:\n{inspector.summary()}')
+            if settings.QUERY_BUDGET_STRICT:
+                raise queries.QueryBudgetExceeded(message)
+            queries.logger.warning(message)
+        return response
+
+
+class PrimaryStickyMiddleware:
+    """После записи в базу закрепляет чтения пользователя за основной базой."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.reset_writes()
+        response = self.get_response(request)
+        if routers.wrote() and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                routers.STICKY_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        routers.reset_writes()
+        return response
+
+
+class HoleMiddleware:
+    """Рендерит фрагменты ``{% hole %}`` для текущего пользователя.
+
+    Стоит после CsrfViewMiddleware и AuthenticationMiddleware: фрагментам
+    нужны ``request.user`` и CSRF-токен, а CSRF-cookie должна выставиться
+    уже после их рендера.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (not response.streaming
+                and response.get('Content-Type', '').startswith('text/html')
+                and holes.MARKER.encode() in response.content):
+            response.content = holes.punch(
+                response.content.decode(response.charset), request)
+        return response
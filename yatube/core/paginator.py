@@ -0,0 +1,166 @@
+import base64
+import binascii
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def _encode(*parts):
+    raw = '|'.join(str(part) for part in parts).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode(cursor):
+    """Части курсора или None, если курсор испорчен."""
+    if not cursor:
+        return None
+    padding = '=' * (-len(cursor) % 4)
+    try:
+        return base64.urlsafe_b64decode(cursor + padding).decode().split('|')
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по паре (key, id) без запроса COUNT(*).
+
+    Страница выбирается непрозрачным курсором, который указывает
+    на крайний пост соседней страницы и направление движения.
+    Нумерованные страницы (``page``) остаются доступны для старых ссылок.
+    По умолчанию новые объекты идут первыми; ``descending=False``
+    листает от старых к новым, как ветку комментариев.
+    """
+
+    def __init__(self, object_list, per_page, key='pub_date',
+                 descending=True):
+        super().__init__(object_list, per_page)
+        self.key = key
+        self.descending = descending
+
+    def encode_cursor(self, obj, direction):
+        return _encode(direction, getattr(obj, self.key).isoformat(), obj.pk)
+
+    def decode_cursor(self, cursor):
+        """Возвращает (направление, значение ключа, id) или None."""
+        try:
+            direction, value, pk = _decode(cursor)
+            value = parse_datetime(value)
+            pk = int(pk)
+        except (TypeError, ValueError):
+            return None
+        if direction not in (NEXT, PREVIOUS) or value is None:
+            return None
+        return direction, value, pk
+
+    def after(self, queryset, position, forward, pk='pk'):
+        """``queryset`` за позицией курсора в порядке обхода.
+
+        ``pk`` — поле, которым различаются объекты с одинаковым ключом.
+        """
+        key = self.key
+        if position is not None:
+            _, value, last = position
+            lookup = 'lt' if forward == self.descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{key}__{lookup}': value})
+                | Q(**{key: value, f'{pk}__{lookup}': last})
+            )
+        if forward == self.descending:
+            return queryset.order_by(f'-{key}', f'-{pk}')
+        return queryset.order_by(key, pk)
+
+    def fetch(self, position, forward, limit):
+        """Первые ``limit`` объектов за позицией курсора."""
+        return list(self.after(self.object_list, position, forward)[:limit])
+
+    def cursor_page(self, cursor=None):
+        """Страница, начинающаяся сразу за курсором."""
+        position = self.decode_cursor(cursor)
+        direction = position[0] if position else None
+        # Вперёд по страницам — в порядке выдачи, назад — в обратном.
+        forward = direction != PREVIOUS
+        rows = self.fetch(position, forward, self.per_page + 1)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            rows.reverse()
+            has_previous, has_next = has_more, True
+        else:
+            has_previous, has_next = direction == NEXT, has_more
+        page = Page(rows, 1, self)
+        self.set_cursors(page, has_previous, has_next)
+        return page
+
+    def page(self, number):
+        page = super().page(number)
+        page.object_list = list(page.object_list)
+        self.set_cursors(page, page.has_previous(), page.has_next())
+        return page
+
+    def set_cursors(self, page, has_previous, has_next):
+        """Добавляет странице курсоры соседних страниц."""
+        rows = page.object_list
+        page.previous_cursor = None
+        page.next_cursor = None
+        if rows and has_previous:
+            page.previous_cursor = self.encode_cursor(rows[0], PREVIOUS)
+        if rows and has_next:
+            page.next_cursor = self.encode_cursor(rows[-1], NEXT)
+
+
+class ValuesCursorPaginator(CursorPaginator):
+    """``CursorPaginator`` для строк ``.values()`` с ключом и ``pk``."""
+
+    def encode_cursor(self, row, direction):
+        return _encode(direction, row[self.key].isoformat(), row['pk'])
+
+
+class RankedPaginator(Paginator):
+    """Курсорная пагинация по заранее ранжированному списку id.
+
+    Курсор указывает на id крайнего объекта соседней страницы, поэтому
+    страница не съезжает, когда выше по выдаче появляются новые объекты.
+    Объекты страницы выбираются из ``queryset`` одним запросом.
+    """
+
+    def __init__(self, ids, per_page, queryset):
+        super().__init__(ids, per_page)
+        self.queryset = queryset
+
+    def decode_cursor(self, cursor):
+        """Возвращает (направление, id) или None."""
+        try:
+            direction, pk = _decode(cursor)
+            pk = int(pk)
+        except (TypeError, ValueError):
+            return None
+        if direction not in (NEXT, PREVIOUS):
+            return None
+        return direction, pk
+
+    def cursor_page(self, cursor=None):
+        ids = self.object_list
+        start = 0
+        position = self.decode_cursor(cursor)
+        if position is not None and position[1] in ids:
+            direction, pk = position
+            index = ids.index(pk)
+            if direction == NEXT:
+                start = index + 1
+            else:
+                start = max(index - self.per_page, 0)
+        page_ids = ids[start:start + self.per_page]
+        objects = self.queryset.in_bulk(page_ids)
+        rows = [objects[pk] for pk in page_ids if pk in objects]
+        page = Page(rows, start // self.per_page + 1, self)
+        page.previous_cursor = None
+        page.next_cursor = None
+        if page_ids and start > 0:
+            page.previous_cursor = _encode(PREVIOUS, page_ids[0])
+        if page_ids and start + self.per_page < len(ids):
+            page.next_cursor = _encode(NEXT, page_ids[-1])
+        return page
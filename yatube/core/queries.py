@@ -0,0 +1,143 @@
+"""Поиск медленных запросов и N+1 по отпечаткам SQL.
+
+Отпечаток — текст запроса без значений: одинаковые отпечатки в одном
+HTTP-запросе означают, что запрос выполняется в цикле. Для каждого
+отпечатка запоминается место, откуда он пришёл: строка шаблона, если
+запрос сделан при рендере, иначе строка кода проекта.
+"""
+import logging
+import os
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Node
+
+logger = logging.getLogger(__name__)
+
+_PATTERNS = (
+    (re.compile(r'/\*.*?\*/|--[^\n]*', re.S), ' '),
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s|\bNULL\b', re.I), '?'),
+    (re.compile(r'\s+'), ' '),
+    (re.compile(r'\bIN \((?:\?, )*\?\)', re.I), 'IN (...)'),
+    (re.compile(r'\bVALUES (?:\((?:\?, )*\?\)(?:, )?)+', re.I),
+     'VALUES (...)'),
+)
+# Обёртки запросов из core не считаются местом, откуда пришёл запрос.
+_WRAPPERS = {
+    os.path.normcase(os.path.join(os.path.dirname(os.path.abspath(
+        __file__)), name))
+    for name in ('metrics.py', 'middleware.py', 'queries.py')
+}
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Запросов к базе больше, чем отведено view или блоку кода."""
+
+
+def fingerprint(sql):
+    """Текст запроса без значений и с одним ``IN (...)`` на любой список."""
+    for pattern, replacement in _PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def origin():
+    """Место, откуда выполняется запрос: строка шаблона или кода проекта."""
+    code = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        node = frame.f_locals.get('self')
+        # type(), а не isinstance: ленивый request.user выполнил бы запрос.
+        if issubclass(type(node), Node) and hasattr(node, 'token'):
+            name = node.origin.template_name or node.origin.name
+            return f'{name}:{node.token.lineno}'
+        path = os.path.normcase(os.path.abspath(frame.f_code.co_filename))
+        if (code is None and path not in _WRAPPERS
+                and path.startswith(str(settings.BASE_DIR))
+                and f'{os.sep}site-packages{os.sep}' not in path):
+            code = (f'{os.path.relpath(path, settings.BASE_DIR)}:'
+                    f'{frame.f_lineno}')
+        frame = frame.f_back
+    return code or '<unknown>'
+
+
+class QueryInspector:
+    """Обёртка ``connection.execute_wrapper``, собирающая отпечатки."""
+
+    def __init__(self, slow_ms=None, repeat_threshold=None):
+        self.slow_ms = (settings.SLOW_QUERY_MS if slow_ms is None
+                        else slow_ms)
+        self.repeat_threshold = (settings.NPLUSONE_THRESHOLD
+                                 if repeat_threshold is None
+                                 else repeat_threshold)
+        self.counts = Counter()
+        self.origins = {}
+
+    def places(self, key):
+        return ', '.join(self.origins[key])
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (perf_counter() - started) * 1000
+            key = fingerprint(sql)
+            self.counts[key] += 1
+            # Стек разбирается для первого запроса и первого повтора —
+            # повтор показывает, где цикл, — а дальше только для медленных.
+            if self.counts[key] <= 2:
+                place = origin()
+                places = self.origins.setdefault(key, [])
+                if place not in places:
+                    places.append(place)
+            if elapsed >= self.slow_ms:
+                logger.warning('Медленный запрос %.1f мс из %s: %s',
+                               elapsed, origin(), sql)
+
+    @contextmanager
+    def install(self, using=None):
+        aliases = [using] if using else list(connections)
+        with ExitStack() as stack:
+            for alias in aliases:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(self))
+            yield self
+
+    def repeated(self):
+        """Повторённые не меньше порога: (отпечаток, число, места)."""
+        return [(key, count, self.places(key))
+                for key, count in self.counts.most_common()
+                if count >= self.repeat_threshold]
+
+    def summary(self):
+        return '\n'.join(f'{count} × {self.places(key)}: {key}'
+                         for key, count in self.counts.most_common())
+
+    def report(self, view):
+        for key, count, places in self.repeated():
+            logger.warning('N+1 во view %s: %d одинаковых запросов из %s: %s',
+                           view, count, places, key)
+
+
+@contextmanager
+def query_budget(limit, using=None):
+    """Проваливает тест, если блок сделал больше ``limit`` запросов."""
+    inspector = QueryInspector(slow_ms=float('inf'))
+    with inspector.install(using):
+        yield inspector
+    if inspector.total > limit:
+        raise QueryBudgetExceeded(
+            f'{inspector.total} запросов при бюджете {limit}:\n'
+            f'{inspector.summary()}')
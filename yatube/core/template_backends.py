@@ -0,0 +1,27 @@
+"""Шаблонизатор Django, замеряющий время рендера для ``core.metrics``."""
+from time import perf_counter
+
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as backend
+
+from core import metrics
+
+
+class Template(backend.Template):
+    def render(self, context=None, request=None):
+        started = perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.record_template(perf_counter() - started)
+
+
+class DjangoTemplates(backend.DjangoTemplates):
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            backend.reraise(exc, self)
@@ -0,0 +1,18 @@
+from django import template
+
+from core import holes
+
+register = template.Library()
+
+
+@register.simple_tag
+def hole(template_name, **arguments):
+    """Метка фрагмента, который ``HoleMiddleware`` отрендерит для запроса.
+
+        {% load holes %}
+        {% hole 'includes/follow_button.html' author=author.username %}
+
+    Фрагмент видит только свои аргументы и контекст-процессоры запроса
+    (``user``, ``request``, ``csrf_token``).
+    """
+    return holes.placeholder(template_name, arguments)
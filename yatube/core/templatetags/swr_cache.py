@@ -0,0 +1,47 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+from django.templatetags.cache import CacheNode
+
+from core.cache import get_or_build
+
+register = template.Library()
+
+
+class SWRCacheNode(CacheNode):
+    def render(self, context):
+        try:
+            timeout = int(self.expire_time_var.resolve(context))
+        except (ValueError, TypeError, template.VariableDoesNotExist):
+            raise template.TemplateSyntaxError(
+                f'"swrcache" tag got a non-integer timeout value: '
+                f'{self.expire_time_var.var!r}'
+            )
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = make_template_fragment_key(self.fragment_name, vary_on)
+        return get_or_build(key, lambda: self.nodelist.render(context),
+                            timeout)
+
+
+@register.tag('swrcache')
+def do_swrcache(parser, token):
+    """Как ``{% cache %}``, но через ``core.cache.get_or_build``.
+
+        {% load swr_cache %}
+        {% swrcache [timeout] [fragment_name] [var1] [var2] .. %}
+            .. some expensive processing ..
+        {% endswrcache %}
+    """
+    nodelist = parser.parse(('endswrcache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{tokens[0]}' tag requires at least 2 arguments."
+        )
+    return SWRCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+        None,
+    )
@@ -0,0 +1,9 @@
+from django.conf import settings
+from django.test import runner
+
+
+class DiscoverRunner(runner.DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_INSPECTOR_SAMPLE_RATE = 0
+        settings.QUERY_BUDGET_STRICT = True
@@ -0,0 +1,30 @@
+"""Помощники тестов, которых нет в Django 2.2."""
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@contextmanager
+def capture_on_commit_callbacks(using=DEFAULT_DB_ALIAS, execute=False):
+    """Перехватывает ``transaction.on_commit`` внутри блока.
+
+    Как ``TestCase.captureOnCommitCallbacks`` в Django 3.2: в TestCase
+    транзакция теста не фиксируется, и без этого функции не вызываются.
+    ``execute=True`` вызывает их при выходе из блока.
+    """
+    callbacks = []
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    try:
+        yield callbacks
+    finally:
+        while True:
+            pending = connection.run_on_commit[start:]
+            if not pending:
+                break
+            del connection.run_on_commit[start:]
+            callbacks.extend(func for _, func in pending)
+            if not execute:
+                break
+            for _, func in pending:
+                func()
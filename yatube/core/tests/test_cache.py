@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from core import cache as swr
+from core.db import routers
+
+
+class GetOrBuildTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def build(self):
+        self.calls += 1
+        return self.calls
+
+    def test_value_is_built_once(self):
+        """Свежее значение берётся из кэша без пересчёта."""
+        self.assertEqual(swr.get_or_build('key', self.build, 60), 1)
+        self.assertEqual(swr.get_or_build('key', self.build, 60), 1)
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_served_while_locked(self):
+        """Пока другой процесс пересчитывает, отдаётся устаревшее значение."""
+        swr.get_or_build('key', self.build, 0)
+        cache.add(swr._lock_key('key'), True)
+        self.assertEqual(swr.get_or_build('key', self.build, 60), 1)
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_rebuilt_by_lock_owner(self):
+        """Устаревшее значение пересчитывает взявший блокировку."""
+        swr.get_or_build('key', self.build, 0)
+        self.assertEqual(swr.get_or_build('key', self.build, 60), 2)
+        self.assertIsNone(cache.get(swr._lock_key('key')))
+
+    def test_waiter_gets_value_built_by_lock_owner(self):
+        """Без значения ожидающий получает результат владельца блокировки."""
+        cache.add(swr._lock_key('key'), True)
+
+        def owner_finishes(seconds):
+            cache.set('key', ('built', 0, 0))
+
+        with mock.patch.object(swr.time, 'sleep', owner_finishes):
+            self.assertEqual(swr.get_or_build('key', self.build, 60), 'built')
+        self.assertEqual(self.calls, 0)
+
+    def test_early_expiration(self):
+        """Дорогое значение может быть пересчитано до истечения срока."""
+        cache.set('key', ('old', swr.time.time() + 1, 10), 60)
+        with mock.patch.object(swr.random, 'random', return_value=0.99):
+            self.assertEqual(swr.get_or_build('key', self.build, 60), 1)
+
+    def test_zero_draw(self):
+        cache.set('key', ('old', swr.time.time() + 1, 10), 60)
+        with mock.patch.object(swr.random, 'random', return_value=0.0):
+            self.assertEqual(swr.get_or_build('key', self.build, 60), 'old')
+
+    @override_settings(DATABASE_REPLICAS=['replica1'],
+                       REPLICA_CACHE_SECONDS=5)
+    def test_replica_value_expires_soon(self):
+        """Значение с реплики и всё, что из него построено, свежо недолго."""
+        def build():
+            routers.ReplicaRouter().db_for_read(None)
+            return 'replica'
+
+        routers.reset_writes()
+        with routers.replica_reads():
+            swr.get_or_build('key', build, 3600)
+            swr.get_or_build(
+                'page', lambda: swr.get_or_build('key', self.build, 3600),
+                3600)
+        swr.get_or_build('primary', self.build, 3600)
+        deadline = swr.time.time() + 5
+        self.assertLessEqual(cache.get('key')[1], deadline)
+        self.assertLessEqual(cache.get('page')[1], deadline)
+        self.assertGreater(cache.get('primary')[1], deadline)
+
+    def test_template_tag(self):
+        """Тег swrcache кэширует фрагмент шаблона."""
+        template = Template(
+            '{% load swr_cache %}{% swrcache 60 fragment key %}'
+            '{{ value }}{% endswrcache %}'
+        )
+        self.assertEqual(template.render(Context({'key': 1, 'value': 'a'})),
+                         'a')
+        self.assertEqual(template.render(Context({'key': 1, 'value': 'b'})),
+                         'a')
+        self.assertEqual(template.render(Context({'key': 2, 'value': 'b'})),
+                         'b')
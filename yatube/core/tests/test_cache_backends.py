@@ -0,0 +1,86 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.cache_backends import FileBasedCache, LocMemCache, SQLiteCache
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = SQLiteCache(f'{self.directory}/cache.sqlite3',
+                                 {'KEY_PREFIX': 'test'})
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_get_set_delete(self):
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_expired_entry_is_missing(self):
+        self.cache.set('key', 'value', 0)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+
+    def test_add_and_incr(self):
+        self.assertTrue(self.cache.add('lock', 1))
+        self.assertFalse(self.cache.add('lock', 2))
+        self.assertEqual(self.cache.incr('lock'), 2)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_entries_shared_between_instances(self):
+        """Записи видны другому экземпляру, как другому процессу."""
+        other = SQLiteCache(f'{self.directory}/cache.sqlite3',
+                            {'KEY_PREFIX': 'test'})
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(other.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2})
+
+    def test_stats(self):
+        self.cache.set('key', 1)
+        self.cache.get('key')
+        self.cache.get('missing')
+        self.cache.get_many(['key', 'missing'])
+        self.assertEqual(self.cache.stats(),
+                         {'hits': 2, 'misses': 2, 'hit_ratio': 0.5})
+
+    def test_cull(self):
+        self.cache._max_entries = 10
+        self.cache.cull_every = 1
+        for i in range(20):
+            self.cache.set(f'key{i}', i)
+        self.assertEqual(self.cache.get('key19'), 19)
+        self.assertLessEqual(len(self.cache.get_many(
+            [f'key{i}' for i in range(20)])), 10)
+
+
+class LocMemStatsTest(SimpleTestCase):
+    def test_stats_counted_once_for_get_many(self):
+        cache = LocMemCache('stats-test', {})
+        cache.set('key', 1)
+        cache.get_many(['key', 'missing'])
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+
+class FileBasedCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = FileBasedCache(self.directory, {'KEY_PREFIX': 'test'})
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_add_is_atomic(self):
+        """Ключ, занятый между проверкой и записью, add не перезаписывает."""
+        self.assertTrue(self.cache.add('lock', 1))
+        with mock.patch.object(FileBasedCache, 'has_key', return_value=False):
+            self.assertFalse(self.cache.add('lock', 2))
+        self.assertEqual(self.cache.get('lock'), 1)
+        self.assertEqual(len(list(self.cache._list_cache_files())), 1)
+
+    def test_add_replaces_expired(self):
+        self.cache.set('lock', 1, timeout=-1)
+        self.assertTrue(self.cache.add('lock', 2))
+        self.assertEqual(self.cache.get('lock'), 2)
@@ -0,0 +1,41 @@
+import shutil
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase
+
+from core.db.sqlite3.base import DatabaseWrapper
+
+
+class SQLiteBackendTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.settings_dict = {
+            **connection.settings_dict,
+            'NAME': f'{directory}/db.sqlite3',
+            'OPTIONS': {'pragmas': {'cache_size': -1024}},
+        }
+
+    def connect(self):
+        wrapper = DatabaseWrapper(self.settings_dict)
+        self.addCleanup(wrapper.close)
+        wrapper.ensure_connection()
+        return wrapper.connection
+
+    def pragma(self, conn, name):
+        return conn.execute(f'PRAGMA {name}').fetchone()[0]
+
+    def test_connection_pragmas(self):
+        conn = self.connect()
+        self.assertEqual(self.pragma(conn, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(conn, 'synchronous'), 1)
+        self.assertEqual(self.pragma(conn, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(conn, 'cache_size'), -1024)
+        self.assertEqual(self.pragma(conn, 'foreign_keys'), 1)
+
+    def test_invalid_pragma_rejected(self):
+        self.settings_dict['OPTIONS'] = {'pragmas': {'cache_size': '1; --'}}
+        with self.assertRaises(ImproperlyConfigured):
+            self.connect()
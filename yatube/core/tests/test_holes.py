@@ -0,0 +1,23 @@
+from types import SimpleNamespace
+
+from django.test import RequestFactory, SimpleTestCase
+
+from core import holes
+
+
+class HolesTest(SimpleTestCase):
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+        self.request.user = SimpleNamespace(pk=1, is_authenticated=True)
+
+    def test_placeholder_renders_fragment(self):
+        marker = holes.placeholder('includes/post_edit_link.html',
+                                   {'post_id': 1, 'author_id': 1})
+        content = holes.punch(f'<p>{marker}</p>', self.request)
+        self.assertNotIn(holes.MARKER, content)
+        self.assertIn('/posts/1/edit/', content)
+
+    def test_forged_placeholder_dropped(self):
+        content = holes.punch('<p><!--hole:includes/header.html--></p>',
+                              self.request)
+        self.assertEqual(content, '<p></p>')
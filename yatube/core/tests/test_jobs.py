@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+calls = []
+
+
+@jobs.task()
+def record(value):
+    calls.append(value)
+
+
+@jobs.task(priority=5)
+def urgent(value):
+    calls.append(value)
+
+
+@jobs.task(max_attempts=2)
+def broken():
+    raise ValueError('сломано')
+
+
+@override_settings(JOBS_EAGER=False, JOBS_RETRY_DELAY=10)
+class QueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_higher_priority_first(self):
+        jobs.enqueue(record, 'обычная')
+        jobs.enqueue(urgent, 'срочная')
+        self.assertEqual(jobs.work(), 2)
+        self.assertEqual(calls, ['срочная', 'обычная'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_claimed_job_not_taken_twice(self):
+        jobs.enqueue(record, 1)
+        self.assertIsNotNone(jobs.claim('first'))
+        self.assertIsNone(jobs.claim('second'))
+
+    def test_failure_retried_later_then_failed(self):
+        job = jobs.enqueue(broken)
+        with self.assertLogs('core.jobs', 'WARNING'):
+            jobs.work()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('сломано', job.last_error)
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.work()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_stale_job_requeued(self):
+        job = jobs.enqueue(record, 1)
+        jobs.claim('dead')
+        Job.objects.filter(pk=job.pk).update(
+            locked_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        jobs.work()
+        self.assertEqual(calls, [1])
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_runs_at_once_and_keeps_going(self):
+        record.delay('сразу')
+        with self.assertLogs('core.jobs', 'ERROR'):
+            broken.delay()
+        self.assertEqual(calls, ['сразу'])
+        self.assertFalse(Job.objects.exists())
+
+
+@override_settings(JOBS_EAGER=False)
+class OnCommitTest(TransactionTestCase):
+    def test_enqueued_after_commit(self):
+        with transaction.atomic():
+            record.delay(1)
+            self.assertFalse(Job.objects.exists())
+        self.assertEqual(Job.objects.get().name, record.name)
+
+    def test_rollback_drops_job(self):
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                record.delay(1)
+                raise ValueError
+        self.assertFalse(Job.objects.exists())
@@ -0,0 +1,96 @@
+import tracemalloc
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Post
+
+User = get_user_model()
+
+
+class HistogramTest(SimpleTestCase):
+    def test_render_cumulative_buckets(self):
+        histogram = metrics.Histogram('latency', 'Время.', (0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe('posts:index', value)
+        lines = histogram.render()
+        self.assertIn('# TYPE latency histogram', lines)
+        self.assertIn('latency_bucket{view="posts:index",le="0.1"} 1', lines)
+        self.assertIn('latency_bucket{view="posts:index",le="1"} 2', lines)
+        self.assertIn('latency_bucket{view="posts:index",le="+Inf"} 3',
+                      lines)
+        self.assertIn('latency_count{view="posts:index"} 3', lines)
+
+    def test_label_escaped(self):
+        counter = metrics.Counter('hits_total', 'Попадания.')
+        counter.inc('a"b', 1)
+        self.assertIn('hits_total{view="a\\"b"} 1', counter.render())
+
+
+class PerformanceMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        Post.objects.create(text='Тестовый пост', author=author)
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.__init__()
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for name in ('total;dur=', 'db;dur=', 'tpl;dur=', 'cache;desc='):
+            self.assertIn(name, timing)
+
+    def test_request_measured_per_view(self):
+        response = self.client.get(reverse('posts:index'))
+        registry = metrics.registry
+        self.assertIn('posts:index', registry.duration.series)
+        counts, total = registry.queries.series['posts:index']
+        self.assertEqual(sum(counts), 1)
+        self.assertGreater(total, 0)
+        self.assertGreater(
+            registry.template_duration.series['posts:index'][1], 0)
+        hits = registry.cache_hits.series['posts:index']
+        misses = registry.cache_misses.series['posts:index']
+        self.assertGreater(hits + misses, 0)
+        self.assertIn(f'cache;desc="{hits} hits, {misses} misses"',
+                      response['Server-Timing'])
+
+    def test_unresolved_path(self):
+        self.client.get('/missing/page/')
+        self.assertIn(
+            '<unresolved>', metrics.registry.duration.series)
+
+    @override_settings(PERF_TRACE_MEMORY=True)
+    def test_memory_traced_when_enabled(self):
+        self.client.get(reverse('posts:index'))
+        self.assertIn('posts:index', metrics.registry.memory.series)
+
+    @override_settings(PERF_TRACE_MEMORY=True)
+    @mock.patch.object(tracemalloc, 'reset_peak', None, create=True)
+    def test_memory_traced_without_reset_peak(self):
+        """На Python до 3.9 нет tracemalloc.reset_peak."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('posts:index', metrics.registry.memory.series)
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'],
+                         'text/plain; version=0.0.4')
+        self.assertContains(
+            response, 'yatube_request_duration_seconds_count'
+                      '{view="posts:index"} 1')
+        self.assertContains(response, 'yatube_db_queries_bucket')
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.1'])
+    def test_metrics_endpoint_restricted(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import HttpResponse
+from django.template import engines
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import path
+
+from core import queries
+from posts.models import Post
+
+User = get_user_model()
+
+
+def authors_view(request):
+    template = engines['django'].from_string(
+        '{% for post in posts %}\n{{ post.author.username }}\n{% endfor %}')
+    return HttpResponse(template.render({'posts': Post.objects.all()}))
+
+
+urlpatterns = [path('authors/', authors_view, name='authors')]
+
+
+class FingerprintTest(SimpleTestCase):
+    def test_values_removed(self):
+        self.assertEqual(
+            queries.fingerprint(
+                "SELECT *  FROM t\n WHERE id = 5 AND name = 'it''s' "
+                'AND x IS NULL'),
+            'SELECT * FROM t WHERE id = ? AND name = ? AND x IS ?')
+
+    def test_lists_collapsed(self):
+        self.assertEqual(
+            queries.fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+            queries.fingerprint('SELECT * FROM t WHERE id IN (%s)'))
+        self.assertEqual(
+            queries.fingerprint('INSERT INTO t VALUES (%s, %s), (%s, %s)'),
+            'INSERT INTO t VALUES (...)')
+
+    def test_identifiers_kept(self):
+        self.assertEqual(queries.fingerprint('SELECT t1.id FROM t1'),
+                         'SELECT t1.id FROM t1')
+
+
+@override_settings(ROOT_URLCONF=__name__, QUERY_INSPECTOR_SAMPLE_RATE=1)
+class QueryInspectorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for number in range(6):
+            author = User.objects.create_user(username=f'author{number}')
+            Post.objects.create(text='Пост', author=author)
+
+    def test_repeated_query_from_template(self):
+        inspector = queries.QueryInspector(repeat_threshold=5)
+        with inspector.install():
+            self.client.get('/authors/')
+        (key, count, places), = inspector.repeated()
+        self.assertEqual(count, 6)
+        self.assertIn('"auth_user"', key)
+        self.assertEqual(places, '<unknown source>:2')
+
+    def test_slow_query_logged(self):
+        inspector = queries.QueryInspector(slow_ms=0)
+        with self.assertLogs('core.queries', 'WARNING') as logs:
+            with inspector.install():
+                Post.objects.count()
+        self.assertIn('core/tests/test_queries.py', logs.output[0])
+
+    def test_middleware_reports_n_plus_one(self):
+        with self.assertLogs('core.queries', 'WARNING') as logs:
+            self.client.get('/authors/')
+        self.assertIn('N+1 во view authors: 6', logs.output[0])
+
+    @override_settings(QUERY_BUDGETS={'authors': 3}, QUERY_BUDGET_STRICT=True)
+    def test_strict_budget_fails_request(self):
+        with self.assertRaises(queries.QueryBudgetExceeded):
+            self.client.get('/authors/')
+
+    @override_settings(QUERY_INSPECTOR_SAMPLE_RATE=0,
+                       QUERY_BUDGETS={'authors': 3}, QUERY_BUDGET_STRICT=True)
+    def test_unsampled_request_not_inspected(self):
+        self.assertEqual(self.client.get('/authors/').status_code, 200)
+
+    def test_query_budget(self):
+        with queries.query_budget(1):
+            Post.objects.count()
+        with self.assertRaisesMessage(queries.QueryBudgetExceeded,
+                                      '2 запросов при бюджете 1'):
+            with queries.query_budget(1, using=connection.alias):
+                Post.objects.count()
+                Post.objects.count()
@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core.db import routers
+from posts.models import Post
+
+User = get_user_model()
+
+
+@routers.read_replica
+def router_view(request):
+    return HttpResponse(routers.ReplicaRouter().db_for_read(Post) or '')
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        self.factory = RequestFactory()
+        routers.reset_writes()
+        self.addCleanup(routers.reset_writes)
+
+    def test_reads_outside_read_only_views_use_primary(self):
+        self.assertIsNone(self.router.db_for_read(Post))
+        self.assertEqual(self.router.db_for_write(Post), routers.PRIMARY)
+
+    def test_read_only_view_reads_from_replica(self):
+        response = router_view(self.factory.get('/'))
+        self.assertIn(response.content, (b'replica1', b'replica2'))
+
+    def test_reads_after_write_stay_on_primary(self):
+        with routers.replica_reads():
+            self.router.db_for_write(Post)
+            self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_sticky_cookie_keeps_primary(self):
+        request = self.factory.get('/')
+        request.COOKIES[routers.STICKY_COOKIE] = '1'
+        self.assertEqual(router_view(request).content, b'')
+
+    def test_unsafe_methods_read_primary(self):
+        self.assertEqual(router_view(self.factory.post('/')).content, b'')
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
+        self.assertIsNone(self.router.allow_migrate('default', 'posts'))
+
+
+class PrimaryStickyMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    @override_settings(DATABASE_REPLICAS=['default'],
+                       REPLICA_STICKY_SECONDS=7)
+    def test_write_sets_sticky_cookie(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn(routers.STICKY_COOKIE, response.cookies)
+        response = self.client.post(reverse('posts:post_create'),
+                                    {'text': 'Новый пост'})
+        cookie = response.cookies[routers.STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], 7)
+
+    def test_no_cookie_without_replicas(self):
+        response = self.client.post(reverse('posts:post_create'),
+                                    {'text': 'Новый пост'})
+        self.assertNotIn(routers.STICKY_COOKIE, response.cookies)
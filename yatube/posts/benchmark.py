@@ -0,0 +1,216 @@
+"""Нагрузочный прогон всех страниц posts.urls через тестовый клиент Django.
+
+Каждая страница запрашивается ``requests`` раз со случайными, но
+воспроизводимыми при одном ``seed`` параметрами. Для неё считаются
+перцентили времени ответа, число запросов к базе и, по желанию, пик
+выделенной памяти. Пишущие запросы выполняются в транзакции, которая
+откатывается, чтобы прогоны не меняли данные и были сравнимы между
+коммитами.
+"""
+import platform
+import random
+import resource
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+import django
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import metrics
+
+from . import urls
+from .dataset import WORDS
+from .models import Comment, Follow, Group, Post, User
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(0, -(-percent * len(ordered) // 100) - 1)
+    return ordered[rank]
+
+
+class Sampler:
+    """Случайные существующие объекты для параметров URL."""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.post_range = Post.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        self.user_range = User.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        self.slugs = list(Group.objects.values_list('slug', flat=True))
+
+    def _pick(self, queryset, bounds):
+        pk = self.rng.randint(bounds['low'], bounds['high'])
+        return (queryset.filter(pk__gte=pk).order_by('pk').first()
+                or queryset.order_by('pk').first())
+
+    def post(self):
+        return self._pick(Post.objects.only('author_id'), self.post_range)
+
+    def user(self):
+        return self._pick(User.objects.all(), self.user_range)
+
+    def followed(self):
+        follow = Follow.objects.filter(
+            user__pk__gte=self.rng.randint(self.user_range['low'],
+                                           self.user_range['high'])
+        ).select_related('user', 'author').order_by('user').first()
+        if follow is None:
+            return self.user(), self.user()
+        return follow.user, follow.author
+
+    def text(self, words):
+        return ' '.join(self.rng.choices(WORDS, k=words))
+
+    # Параметры страниц: (метод, данные формы, пользователь, аргументы URL).
+    def index(self):
+        return 'get', None, None, []
+
+    def group_posts(self):
+        return 'get', None, None, [self.rng.choice(self.slugs)]
+
+    def search(self):
+        return 'get', {'q': ' '.join(self.rng.sample(WORDS, 2))}, None, []
+
+    def profile(self):
+        return 'get', None, None, [self.user().username]
+
+    def post_detail(self):
+        return 'get', None, None, [self.post().pk]
+
+    def post_comments(self):
+        return 'get', None, None, [self.post().pk]
+
+    def post_create(self):
+        return 'post', {'text': self.text(20)}, self.user(), []
+
+    def post_edit(self):
+        post = self.post()
+        return 'get', None, User.objects.get(pk=post.author_id), [post.pk]
+
+    def add_comment(self):
+        return 'post', {'text': self.text(8)}, self.user(), [self.post().pk]
+
+    def follow_index(self):
+        return 'get', None, self.followed()[0], []
+
+    def profile_follow(self):
+        return 'get', None, self.user(), [self.user().username]
+
+    def profile_unfollow(self):
+        user, author = self.followed()
+        return 'get', None, user, [author.username]
+
+    def request(self, name):
+        """(метод, путь, данные, пользователь) для страницы ``name``."""
+        method, data, user, args = getattr(self, name)()
+        return method, reverse(f'posts:{name}', args=args), data, user
+
+
+# Все страницы приложения; для каждой в Sampler есть метод с её именем.
+NAMES = tuple(pattern.name for pattern in urls.urlpatterns)
+
+
+def _send(client, method, path, data):
+    # Откатывается каждый запрос, а не только POST: GET-страницы вроде
+    # profile_follow тоже пишут, а данные должны быть одинаковы для всех
+    # прогонов.
+    with transaction.atomic():
+        response = getattr(client, method)(path, data)
+        transaction.set_rollback(True)
+    return response
+
+
+def measure(name, sampler, requests, warmup=0, memory=False):
+    """Замеры одной страницы: перцентили, запросы к базе, память."""
+    timings, queries, peaks, errors = [], [], [], 0
+    for number in range(warmup + requests):
+        method, path, data, user = sampler.request(name)
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        if memory:
+            metrics.reset_memory_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = _send(client, method, path, data)
+            elapsed = time.perf_counter() - started
+        if number < warmup:
+            continue
+        timings.append(elapsed * 1000)
+        queries.append(len(captured))
+        if memory:
+            peaks.append((tracemalloc.get_traced_memory()[1] - baseline)
+                         / 1024)
+        if response.status_code >= 400:
+            errors += 1
+    result = {
+        'requests': requests,
+        'errors': errors,
+        'mean_ms': sum(timings) / len(timings),
+        'queries_mean': sum(queries) / len(queries),
+        'queries_max': max(queries),
+    }
+    for percent in PERCENTILES:
+        result[f'p{percent}_ms'] = percentile(timings, percent)
+    if memory:
+        result['memory_p95_kb'] = percentile(peaks, 95)
+    return result
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(names=NAMES, requests=100, warmup=5, seed=1, memory=False,
+        report=None):
+    """Прогоняет страницы и возвращает результаты со сведениями о запуске."""
+    report = report or (lambda name, result: None)
+    if memory:
+        tracemalloc.start()
+    results = {}
+    try:
+        for name in names:
+            # У каждой страницы свой поток случайных чисел: состав
+            # прогона не влияет на параметры запросов.
+            sampler = Sampler(f'{seed}:{name}')
+            results[name] = measure(name, sampler, requests, warmup, memory)
+            report(name, results[name])
+    finally:
+        if memory:
+            tracemalloc.stop()
+    return {
+        'meta': {
+            'commit': _commit(),
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'seed': seed,
+            'requests': requests,
+            'dataset': {
+                'users': User.objects.count(),
+                'groups': Group.objects.count(),
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+        'urls': results,
+    }
@@ -0,0 +1,130 @@
+"""Версионированный кэш лент и карточек постов.
+
+Ключ фрагмента включает поколения (generation) тех данных, от которых он
+зависит. Сигналы ``Post``/``Comment``/``Follow`` увеличивают поколение, и
+старые фрагменты просто перестают запрашиваться, поэтому хранить их можно
+долго, а сбрасывать весь кэш не нужно. Поколение меняется после фиксации
+транзакции (``bump_on_commit``): иначе читатель успел бы сохранить под
+новым поколением фрагмент, построенный по старым строкам.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+KEY_PREFIX = 'posts'
+GENERATION_TIMEOUT = None
+ALL_POSTS = 'all'
+
+
+def make_key(*parts):
+    """Единая схема ключей posts: ``posts:<вид>:<части>``.
+
+    Общий префикс и версия всего кэша задаются в ``settings.CACHES``.
+    """
+    return ':'.join(str(part) for part in (KEY_PREFIX, *parts))
+
+
+def _generation_key(scope):
+    return make_key('generation', scope)
+
+
+def _modified_key(scope):
+    return make_key('modified', scope)
+
+
+def _new_generation():
+    # Начальное значение из времени: после вытеснения счётчика из кэша
+    # новое поколение не совпадёт ни с одним из прежних.
+    return int(time.time() * 1000)
+
+
+def get_generations(*scopes):
+    """Текущие поколения областей в порядке аргументов."""
+    keys = [_generation_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: _new_generation() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, GENERATION_TIMEOUT)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def bump(*scopes):
+    """Делает устаревшими все фрагменты, зависящие от областей."""
+    for scope in scopes:
+        key = _generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_generation(), GENERATION_TIMEOUT)
+    now = time.time()
+    cache.set_many({_modified_key(scope): now for scope in scopes},
+                   GENERATION_TIMEOUT)
+
+
+def after_commit(func):
+    """Вызывает ``func`` после фиксации текущей транзакции.
+
+    Вне транзакции и при ON_COMMIT_EAGER — сразу.
+    """
+    if settings.ON_COMMIT_EAGER:
+        func()
+    else:
+        transaction.on_commit(func)
+
+
+def bump_on_commit(*scopes):
+    """``bump`` после фиксации текущей транзакции."""
+    after_commit(lambda: bump(*scopes))
+
+
+def last_modified(*scopes):
+    """Время последнего изменения областей (секунды Unix).
+
+    Для областей без отметки в кэше временем изменения считается
+    текущий момент: так Last-Modified не окажется раньше настоящего.
+    """
+    keys = [_modified_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: time.time() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, GENERATION_TIMEOUT)
+        found.update(missing)
+    return max(found.values())
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def follow_scope(user_id):
+    return f'follow:{user_id}'
+
+
+def followers_scope(author_id):
+    return f'followers:{author_id}'
+
+
+def feed_key(request, *scopes):
+    """Ключ страницы ленты: области, их поколения и страница."""
+    page = request.GET.get('cursor') or request.GET.get('page') or ''
+    generations = get_generations(*scopes)
+    return make_key('feed', *scopes, *generations, page)
+
+
+def attach_versions(posts):
+    """Добавляет постам поколение для ключа кэша карточки."""
+    posts = list(posts)
+    versions = get_generations(*(post_scope(post.pk) for post in posts))
+    for post, version in zip(posts, versions):
+        post.cache_version = version
@@ -0,0 +1,130 @@
+"""Условные GET-ответы по поколениям кэша posts.caching.
+
+ETag страницы — хеш её адреса и поколений областей, от которых она
+зависит, Last-Modified — время последнего изменения этих областей. Всё
+это берётся из кэша, поэтому 304 отдаётся без запросов к лентам.
+Анонимные ответы помечаются public с ``s-maxage``, чтобы их мог хранить
+обратный прокси; ответы вошедшим пользователям — private.
+
+HTML-страницы к тому же кэшируются целиком по пути, номеру страницы или
+курсору и тем же поколениям: прочие параметры адреса на страницу не
+влияют и новых записей в кэше не создают. Тело страницы строится от
+имени анонима и одинаково для всех, а фрагменты вошедшего пользователя
+вставляет ``core.holes``.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+
+from core.cache import get_or_build
+
+from . import caching
+
+# Параметры адреса, которые читают страницы с общим кэшем.
+PAGE_PARAMS = ('page', 'cursor')
+
+
+def _digest(parts):
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def cached_page(request, key, build):
+    """Ответ ``build()`` из кэша страниц; строится от имени анонима.
+
+    ``PAGE_CACHE_SECONDS = 0`` выключает кэш страниц.
+    """
+    if not settings.PAGE_CACHE_SECONDS:
+        return build()
+
+    def render():
+        user = request.user
+        request.user = AnonymousUser()
+        try:
+            response = build()
+        finally:
+            request.user = user
+        return (response.status_code, response['Content-Type'],
+                response.content)
+
+    status, content_type, content = get_or_build(
+        caching.make_key('page', key), render, settings.PAGE_CACHE_SECONDS)
+    return HttpResponse(content, content_type=content_type, status=status)
+
+
+def respond(request, scopes, build, personal=False, shared=False,
+            viewer_scopes=()):
+    """Ответ ``build()`` с ETag и Last-Modified или 304.
+
+    ETag личных ответов включает пользователя: у разных читателей
+    поколения областей могут совпасть. ``shared`` — тело ответа не зависит
+    от пользователя и кэшируется целиком. ``viewer_scopes`` — области
+    фрагментов читателя: они меняют ETag, но не ключ общей страницы.
+    """
+    generations = [str(generation)
+                   for generation in caching.get_generations(*scopes)]
+    page_key = _digest([
+        request.path,
+        *(request.GET.get(name, '') for name in PAGE_PARAMS),
+        *generations,
+    ])
+    parts = [request.get_full_path(), *generations]
+    parts.extend(map(str, caching.get_generations(*viewer_scopes)))
+    if personal:
+        parts.append(str(request.user.pk))
+    etag = quote_etag(_digest(parts))
+    modified = int(caching.last_modified(*scopes, *viewer_scopes))
+    response = get_conditional_response(
+        request, etag=etag, last_modified=modified)
+    if response is None and shared:
+        response = cached_page(request, page_key, build)
+    elif response is None:
+        response = build()
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(modified)
+    # Страница с CSRF-токеном выставит cookie: её нельзя отдавать другим.
+    if personal or request.META.get('CSRF_COOKIE_USED'):
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, public=True, max_age=0,
+                            s_maxage=settings.PROXY_CACHE_SECONDS)
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def viewer_follows(request):
+    """Подписки читателя: от них зависят ссылки подписки на авторов."""
+    if request.user.is_authenticated:
+        return [caching.follow_scope(request.user.pk)]
+    return []
+
+
+def condition(scopes, viewer_scopes=None):
+    """Проверяет If-None-Match/If-Modified-Since до запуска view.
+
+    ``scopes(request, *args, **kwargs)`` возвращает области страницы и
+    словарь объектов, которые понадобились для их поиска; объекты
+    передаются во view именованными аргументами, чтобы не читать их
+    из базы второй раз. ``viewer_scopes(request)`` — области фрагментов,
+    которые ``core.holes`` вставляет для читателя.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            found, objects = scopes(request, *args, **kwargs)
+            kwargs.update(objects)
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            return respond(
+                request, found, lambda: view(request, *args, **kwargs),
+                personal=request.user.is_authenticated, shared=True,
+                viewer_scopes=viewer_scopes(request) if viewer_scopes
+                else ())
+        return wrapper
+    return decorator
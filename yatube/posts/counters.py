@@ -0,0 +1,79 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются атомарным ``UPDATE ... SET n = n + 1`` в той же
+транзакции, что и сама запись; команда ``rebuild_counters`` пересчитывает
+их с нуля.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Group, Post, User, UserCounter
+
+BATCH_SIZE = 500
+
+
+def _change(queryset, field, delta):
+    queryset.update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def change_user(user_id, field, delta):
+    _change(UserCounter.objects.filter(user_id=user_id), field, delta)
+
+
+def change_users(user_ids, field, delta):
+    """Тот же счётчик нескольких пользователей одним UPDATE."""
+    if user_ids:
+        _change(UserCounter.objects.filter(user_id__in=user_ids), field,
+                delta)
+
+
+def change_group(group_id, delta):
+    if group_id is not None:
+        _change(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def change_post(post_id, delta):
+    _change(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def _count(queryset, field):
+    """Подзапрос с числом строк, ссылающихся на OuterRef('pk')."""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def rebuild_users(users=None):
+    """Создаёт недостающие строки UserCounter и пересчитывает их."""
+    if users is None:
+        users = User.objects.all()
+    UserCounter.objects.bulk_create(
+        (UserCounter(user_id=pk)
+         for pk in users.values_list('pk', flat=True).iterator()),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    UserCounter.objects.filter(user__in=users).update(
+        posts_count=_count(Post.objects.all(), 'author'),
+        followers_count=_count(Follow.objects.all(), 'author'),
+        following_count=_count(Follow.objects.all(), 'user'),
+    )
+
+
+def rebuild():
+    """Пересчитывает все счётчики по текущим данным."""
+    rebuild_users()
+    Group.objects.update(posts_count=_count(Post.objects.all(), 'group'))
+    Post.objects.update(
+        comments_count=_count(Comment.objects.all(), 'post')
+    )
+
+
+def get_counters(user):
+    """Счётчики пользователя; недостающая строка пересчитывается."""
+    try:
+        return UserCounter.objects.get(user=user)
+    except UserCounter.DoesNotExist:
+        rebuild_users(User.objects.filter(pk=user.pk))
+        return UserCounter.objects.get(user=user)
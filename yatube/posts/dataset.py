@@ -0,0 +1,146 @@
+"""Синтетические данные для нагрузочных замеров.
+
+Популярность авторов подчиняется степенному закону: на немногих авторов
+подписано большинство читателей, и они же пишут большую часть постов.
+Генератор детерминирован при одном и том же ``seed``, поэтому замеры на
+разных коммитах идут на одинаковых данных.
+"""
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Comment, Follow, Group, Post, User
+from .transfer import BATCH_SIZE, bulk_insert
+
+ALPHA = 1.1
+MAX_FOLLOWS = 2000
+GROUP_SHARE = 0.7
+PERIOD = timedelta(days=365)
+
+WORDS = (
+    'сегодня вчера утро вечер город дом улица парк река море лес поле '
+    'кошка собака птица дерево цветок солнце дождь снег ветер небо '
+    'книга фильм музыка песня театр выставка картина фотография '
+    'работа проект задача встреча команда код сервер база запрос '
+    'друг семья мама папа брат сестра сосед коллега учитель студент '
+    'новый старый большой маленький красивый интересный быстрый '
+    'читать писать смотреть слушать гулять готовить думать работать '
+    'python django sqlite кэш лента пост комментарий подписка группа'
+).split()
+FIRST_NAMES = ('Анна', 'Иван', 'Мария', 'Пётр', 'Ольга', 'Сергей', 'Елена',
+               'Дмитрий', 'Наталья', 'Алексей')
+LAST_NAMES = ('Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев',
+              'Петров', 'Соколов', 'Михайлов', 'Новиков', 'Фёдоров')
+
+
+def _next_id(model):
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+def _save(model, objects, batch_size):
+    """Сохраняет объекты пачками; возвращает их число."""
+    saved = 0
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == batch_size:
+            with transaction.atomic():
+                bulk_insert(model, batch)
+            saved += len(batch)
+            batch = []
+    if batch:
+        with transaction.atomic():
+            bulk_insert(model, batch)
+        saved += len(batch)
+    return saved
+
+
+def _text(rng, low, high):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high))).capitalize()
+
+
+def generate(users=100_000, posts=10_000_000, groups=50,
+             follows_per_user=20, comments_per_post=0.5, seed=1,
+             batch_size=BATCH_SIZE, report=None):
+    """Добавляет в базу синтетических пользователей, посты и связи.
+
+    ``report(kind, count)`` вызывается после каждой таблицы.
+    """
+    rng = random.Random(seed)
+    report = report or (lambda kind, count: None)
+    password = make_password(None)
+    now = timezone.now()
+
+    first_user = _next_id(User)
+    user_ids = range(first_user, first_user + users)
+    report('users', _save(User, (
+        User(id=pk, username=f'user{pk}', password=password,
+             first_name=rng.choice(FIRST_NAMES),
+             last_name=rng.choice(LAST_NAMES), date_joined=now - PERIOD)
+        for pk in user_ids
+    ), batch_size))
+
+    first_group = _next_id(Group)
+    group_ids = range(first_group, first_group + groups)
+    report('groups', _save(Group, (
+        Group(id=pk, title=f'Группа {pk}', slug=f'group-{pk}',
+              description=_text(rng, 5, 20))
+        for pk in group_ids
+    ), batch_size))
+
+    # Вес автора убывает со степенью его номера: user{first_user} —
+    # самый популярный. Активность (число постов) распределена так же,
+    # но независимо от популярности.
+    popularity = list(accumulate(
+        1 / rank ** ALPHA for rank in range(1, users + 1)))
+    activity = list(range(users))
+    rng.shuffle(activity)
+    activity = list(accumulate(1 / (rank + 1) ** ALPHA for rank in activity))
+
+    def follows():
+        for user_id in user_ids:
+            count = min(MAX_FOLLOWS, int(
+                rng.paretovariate(1.5) * follows_per_user / 3))
+            authors = set(rng.choices(user_ids, cum_weights=popularity,
+                                      k=count))
+            authors.discard(user_id)
+            for author_id in sorted(authors):
+                yield Follow(user_id=user_id, author_id=author_id)
+    report('follows', _save(Follow, follows(), batch_size))
+
+    first_post = _next_id(Post)
+    step = PERIOD / max(posts, 1)
+    start = now - PERIOD
+
+    def post_rows():
+        for number in range(posts):
+            in_group = group_ids and rng.random() < GROUP_SHARE
+            yield Post(
+                id=first_post + number,
+                author_id=rng.choices(user_ids, cum_weights=activity)[0],
+                group_id=rng.choice(group_ids) if in_group else None,
+                text=_text(rng, 5, 60),
+                pub_date=start + step * number,
+            )
+    report('posts', _save(Post, post_rows(), batch_size))
+
+    def comments():
+        for number in range(posts):
+            count = 0
+            if comments_per_post:
+                count = int(rng.expovariate(1 / comments_per_post))
+            pub_date = start + step * number
+            for _ in range(count):
+                yield Comment(
+                    post_id=first_post + number,
+                    author_id=rng.choice(user_ids),
+                    text=_text(rng, 2, 20),
+                    created=pub_date + timedelta(
+                        minutes=rng.randint(1, 600)),
+                )
+    report('comments', _save(Comment, comments(), batch_size))
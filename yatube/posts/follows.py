@@ -0,0 +1,168 @@
+"""Граф подписок: подписка и отписка пачками, проверки подписок.
+
+Подписки пишутся одним ``INSERT ... ON CONFLICT DO NOTHING RETURNING``, а
+удаляются ``DELETE ... RETURNING``: база сама отвечает, какие строки
+действительно появились или исчезли, так что одновременные запросы не
+упираются в ``unique_author_user_following`` и не считают подписку
+дважды. Сигналы моделей при этом не срабатывают, поэтому счётчики,
+ленты и поколения кэша меняются в ``changed`` только для этих строк.
+Без RETURNING (SQLite до 3.35) строки пишутся ``bulk_create`` с
+``ignore_conflicts``, а изменившиеся находятся сравнением подписок до и
+после записи.
+"""
+from django.db import connection, transaction
+
+from . import caching, counters, tasks
+from .models import Follow, User
+
+BATCH_SIZE = 500
+
+
+def changed(user_id, author_ids, delta):
+    """Последствия подписки (delta=1) или отписки (delta=-1) от авторов."""
+    if not author_ids:
+        return
+    counters.change_user(user_id, 'following_count',
+                         delta * len(author_ids))
+    counters.change_users(author_ids, 'followers_count', delta)
+    tasks.sync_follow.delay(user_id, *author_ids)
+    caching.bump_on_commit(
+        caching.follow_scope(user_id),
+        *(caching.followers_scope(pk) for pk in author_ids))
+
+
+def _batches(author_ids):
+    author_ids = list(dict.fromkeys(author_ids))
+    for start in range(0, len(author_ids), BATCH_SIZE):
+        yield author_ids[start:start + BATCH_SIZE]
+
+
+def _returning():
+    """Умеет ли база INSERT и DELETE ... RETURNING (SQLite — с 3.35)."""
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return connection.vendor == 'postgresql'
+
+
+def _insert_returning(user_id, batch):
+    placeholders = ', '.join(['%s'] * len(batch))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {Follow._meta.db_table} (user_id, author_id) '
+            f'SELECT %s, id FROM {User._meta.db_table} '
+            f'WHERE id IN ({placeholders}) AND id <> %s '
+            'ON CONFLICT DO NOTHING RETURNING author_id',
+            [user_id, *batch, user_id],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _delete_returning(user_id, batch):
+    placeholders = ', '.join(['%s'] * len(batch))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {Follow._meta.db_table} '
+            f'WHERE user_id = %s AND author_id IN ({placeholders}) '
+            'RETURNING author_id',
+            [user_id, *batch],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _lock_reader(user_id):
+    # Без RETURNING изменившиеся строки находятся сравнением с подписками
+    # до записи. Пустой UPDATE счётчика читателя (в SQLite он блокирует
+    # запись во всю базу) до конца транзакции не даёт другому запросу
+    # изменить его подписки между чтением и записью.
+    counters.change_user(user_id, 'following_count', 0)
+
+
+def _insert_diff(user_id, batch):
+    _lock_reader(user_id)
+    before = following_ids(user_id, batch)
+    authors = User.objects.filter(pk__in=batch).exclude(
+        pk__in=[user_id, *before]).values_list('pk', flat=True)
+    Follow.objects.bulk_create(
+        [Follow(user_id=user_id, author_id=pk) for pk in authors],
+        ignore_conflicts=True,
+    )
+    return list(following_ids(user_id, batch) - before)
+
+
+def _delete_diff(user_id, batch):
+    _lock_reader(user_id)
+    deleted = list(following_ids(user_id, batch))
+    if deleted:
+        # Через ORM удаление вызвало бы сигналы и второй ``changed``.
+        placeholders = ', '.join(['%s'] * len(deleted))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {Follow._meta.db_table} '
+                f'WHERE user_id = %s AND author_id IN ({placeholders})',
+                [user_id, *deleted],
+            )
+    return deleted
+
+
+@transaction.atomic
+def follow_many(user_id, author_ids):
+    """Подписывает на авторов; id новых подписок.
+
+    Себя, несуществующих и уже отслеживаемых авторов пропускает.
+    """
+    insert = _insert_returning if _returning() else _insert_diff
+    created = []
+    for batch in _batches(author_ids):
+        created.extend(insert(user_id, batch))
+    changed(user_id, created, 1)
+    return created
+
+
+@transaction.atomic
+def unfollow_many(user_id, author_ids):
+    """Отписывает от авторов; id подписок, которые были удалены."""
+    delete = _delete_returning if _returning() else _delete_diff
+    deleted = []
+    for batch in _batches(author_ids):
+        deleted.extend(delete(user_id, batch))
+    changed(user_id, deleted, -1)
+    return deleted
+
+
+def follow(user_id, author_id):
+    """Подписывает на автора; False, если подписка уже была."""
+    return bool(follow_many(user_id, [author_id]))
+
+
+def unfollow(user_id, author_id):
+    """Отписывает от автора; False, если подписки не было."""
+    return bool(unfollow_many(user_id, [author_id]))
+
+
+def following_ids(user_id, author_ids):
+    """Те из авторов, на кого подписан читатель, одним запросом."""
+    author_ids = list(dict.fromkeys(author_ids))
+    if user_id is None or not author_ids:
+        return set()
+    return set(Follow.objects.filter(
+        user_id=user_id, author_id__in=author_ids,
+    ).values_list('author_id', flat=True))
+
+
+def is_following(user_id, author_id):
+    return author_id in following_ids(user_id, [author_id])
+
+
+def mutual_ids(user_id, author_ids):
+    """Авторы, с которыми читатель подписан друг на друга."""
+    author_ids = list(dict.fromkeys(author_ids))
+    if user_id is None or not author_ids:
+        return set()
+    return set(Follow.objects.filter(
+        user_id=user_id, author_id__in=author_ids,
+        author__follower__author_id=user_id,
+    ).values_list('author_id', flat=True))
+
+
+def is_mutual(user_id, author_id):
+    return author_id in mutual_ids(user_id, [author_id])
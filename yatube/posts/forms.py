@@ -1,9 +1,53 @@
-from xml.etree.ElementTree import Comment
+import os
+from io import BytesIO
 
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile, UploadedFile
 from django.forms import ModelForm
+from PIL import Image, ImageOps
 
 from .models import Comment, Post
+from .uploadhandlers import pixel_error
+
+# Форматы, которые сохраняются как есть; остальные пережимаются в PNG.
+KEPT_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+def reencode(upload):
+    """Пережимает загруженную картинку без EXIF и не больше MAX_SIDE.
+
+    Анимированные картинки остаются как есть: в них нет EXIF, а
+    пережатие оставило бы только первый кадр. Картинку, которую Pillow
+    не может прочитать целиком, форма отклоняет.
+    """
+    upload.seek(0)
+    try:
+        with Image.open(upload) as image:
+            if getattr(image, 'is_animated', False):
+                upload.seek(0)
+                return upload
+            image_format = (image.format if image.format in KEPT_FORMATS
+                            else 'PNG')
+            image = ImageOps.exif_transpose(image)
+            side = settings.POST_IMAGE_MAX_SIDE
+            image.thumbnail((side, side), Image.LANCZOS)
+            if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            elif image_format == 'PNG' and image.mode not in ('RGB', 'RGBA'):
+                alpha = ('A' in image.getbands()
+                         or 'transparency' in image.info)
+                image = image.convert('RGBA' if alpha else 'RGB')
+            buffer = BytesIO()
+            image.save(buffer, image_format, optimize=True)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        raise forms.ValidationError('Не удалось прочитать картинку.')
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    return SimpleUploadedFile(
+        f'{stem}.{KEPT_FORMATS[image_format]}',
+        buffer.getvalue(),
+        Image.MIME[image_format],
+    )
 
 
 class PostForm(ModelForm):
@@ -14,6 +58,29 @@ class PostForm(ModelForm):
             'text': forms.Textarea(attrs={'rows': 10, 'cols': 40}),
         }
 
+    def __init__(self, *args, upload_errors=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_errors = upload_errors or {}
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            # Заголовок, не попавший в первый кусок загрузки, проверяется
+            # здесь, по всему файлу.
+            image.seek(0)
+            message = pixel_error(image)
+            if message:
+                raise forms.ValidationError(message)
+            return reencode(image)
+        return image
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field, message in self.upload_errors.items():
+            if field in self.fields:
+                self.add_error(field, message)
+        return cleaned_data
+
 
 class CommentForm(ModelForm):
     class Meta:
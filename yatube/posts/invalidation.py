@@ -0,0 +1,134 @@
+"""Правки постов и комментариев и точечная инвалидация после них.
+
+Перед сохранением ``remember`` читает прежние значения отслеживаемых
+полей: если они поменялись, у объекта растут ``revision`` и
+``updated_at``. После сохранения или удаления сигнал описывает изменение
+(``Change``), а ``dispatch`` собирает из ``PURGES`` области posts.caching,
+которые от него устарели, увеличивает их поколения одним вызовом и
+правит поисковый индекс: слова комментария сразу, пост — задачей.
+Поколения и переиндексация поста меняются после фиксации транзакции,
+когда новые строки уже видны читателям. Весь кэш не сбрасывается, а
+сохранение без изменений не сбрасывает ничего.
+"""
+from django.utils import timezone
+
+from . import caching, search, tasks
+from .models import Comment, Post
+
+# Поля, правка которых видна читателю и даёт новую ревизию.
+TRACKED = {
+    Post: ('text', 'author_id', 'group_id', 'image'),
+    Comment: ('text',),
+}
+
+
+class Change:
+    """Что изменилось у поста: поля и авторы и группы до и после."""
+
+    def __init__(self, post_id, fields, authors=(), groups=(),
+                 comment=False, deleted=False, texts=('', '')):
+        self.post_id = post_id
+        self.fields = frozenset(fields)
+        self.authors = {pk for pk in authors if pk is not None}
+        self.groups = {pk for pk in groups if pk is not None}
+        self.comment = comment
+        self.deleted = deleted
+        # Текст комментария до и после изменения.
+        self.texts = texts
+
+
+def _value(instance, name):
+    field = instance._meta.get_field(name)
+    return field.get_prep_value(field.value_from_object(instance))
+
+
+def changed_fields(instance, previous):
+    """Отслеживаемые поля, отличающиеся от строки ``previous``."""
+    if previous is None:
+        return set(TRACKED[type(instance)])
+    return {name for name in TRACKED[type(instance)]
+            if _value(instance, name) != previous[name]}
+
+
+def remember(instance):
+    """Запоминает прежние значения и поднимает ревизию при правке."""
+    model = type(instance)
+    instance._previous = None
+    if instance.pk is None:
+        return
+    instance._previous = model.objects.filter(pk=instance.pk).values(
+        *TRACKED[model], 'revision').first()
+    previous = instance._previous
+    if previous is not None and changed_fields(instance, previous):
+        instance.revision = previous['revision'] + 1
+        instance.updated_at = timezone.now()
+
+
+def post_saved(instance, created):
+    previous = None if created else getattr(instance, '_previous', None)
+    authors, groups = [instance.author_id], [instance.group_id]
+    if previous is not None:
+        authors.append(previous['author_id'])
+        groups.append(previous['group_id'])
+    return Change(instance.pk, changed_fields(instance, previous),
+                  authors, groups)
+
+
+def post_deleted(instance):
+    return Change(instance.pk, TRACKED[Post], [instance.author_id],
+                  [instance.group_id], deleted=True)
+
+
+def comment_saved(instance, created):
+    previous = None if created else getattr(instance, '_previous', None)
+    old_text = previous['text'] if previous is not None else ''
+    return Change(instance.post_id, changed_fields(instance, previous),
+                  comment=True, texts=(old_text, instance.text))
+
+
+def comment_deleted(instance):
+    return Change(instance.post_id, TRACKED[Comment], comment=True,
+                  deleted=True, texts=(instance.text, ''))
+
+
+def post_detail(change):
+    return [caching.post_scope(change.post_id)]
+
+
+def author_pages(change):
+    if change.comment:
+        return []
+    return [caching.author_scope(pk) for pk in change.authors]
+
+
+def group_pages(change):
+    if change.comment:
+        return []
+    return [caching.group_scope(pk) for pk in change.groups]
+
+
+def timelines(change):
+    # Главная и ленты подписок зависят от общего поколения постов.
+    return [] if change.comment else [caching.ALL_POSTS]
+
+
+PURGES = [post_detail, author_pages, group_pages, timelines]
+
+
+def dispatch(change, reindex=True):
+    """Сбрасывает области, затронутые изменением, и правит индекс поиска."""
+    if not change.fields:
+        return
+    scopes = []
+    for purge in PURGES:
+        scopes.extend(purge(change))
+    caching.bump_on_commit(*dict.fromkeys(scopes))
+    # В поиске только тексты постов и комментариев.
+    if not reindex or 'text' not in change.fields:
+        return
+    if change.comment:
+        # Слова комментария пишутся в базу вместе с ним.
+        search.index_comment(change.post_id, *change.texts)
+    else:
+        post_ids = [change.post_id]
+        caching.after_commit(lambda: tasks.index_posts.delay(post_ids))
@@ -0,0 +1,68 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment
+
+from posts import benchmark
+
+COLUMNS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries_mean', 'memory_p95_kb')
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время ответа, число запросов к базе и память для '
+            'каждой страницы posts.urls на текущих данных.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--only', action='append',
+                            choices=benchmark.NAMES,
+                            help='Замерить только эту страницу.')
+        parser.add_argument('--memory', action='store_true',
+                            help='Считать пик памяти (заметно медленнее).')
+        parser.add_argument('--output', help='Сохранить результаты в JSON.')
+        parser.add_argument('--compare',
+                            help='JSON прошлого прогона для сравнения.')
+
+    def handle(self, *args, **options):
+        previous = {}
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as stream:
+                    previous = json.load(stream)['urls']
+            except (OSError, ValueError, KeyError) as error:
+                raise CommandError(f'Не прочитать {options["compare"]}: '
+                                   f'{error}')
+        # Тестовый клиент ходит на хост testserver.
+        setup_test_environment()
+        self.stdout.write(f'{"страница":<18}' + ''.join(
+            f'{column:>16}' for column in COLUMNS) + f'{"ошибки":>8}')
+
+        def report(name, result):
+            cells = []
+            for column in COLUMNS:
+                value = result.get(column)
+                cell = '' if value is None else f'{value:.1f}'
+                old = previous.get(name, {}).get(column)
+                if value is not None and old:
+                    cell += f' ({(value - old) / old:+.0%})'
+                cells.append(f'{cell:>16}')
+            self.stdout.write(f'{name:<18}' + ''.join(cells)
+                              + f'{result["errors"]:>8}')
+
+        results = benchmark.run(
+            names=options['only'] or benchmark.NAMES,
+            requests=options['requests'],
+            warmup=options['warmup'],
+            seed=options['seed'],
+            memory=options['memory'],
+            report=report,
+        )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(results, stream, ensure_ascii=False, indent=2)
+        meta = results['meta']
+        self.stdout.write(self.style.SUCCESS(
+            f'Коммит {meta["commit"]}, данные {meta["dataset"]}, '
+            f'пик RSS {meta["max_rss_kb"] / 1024:.0f} МБ'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Строит недостающие миниатюры постов.'
+
+    def handle(self, *args, **options):
+        built = 0
+        posts = Post.objects.exclude(image='').only('image', 'thumbnail')
+        for post in posts.iterator():
+            if post.thumbnail.name != thumbnails.thumbnail_name(post):
+                thumbnails.generate(post.pk)
+                built += 1
+        self.stdout.write(self.style.SUCCESS(f'Построено миниатюр: {built}'))
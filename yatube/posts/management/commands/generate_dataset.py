@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import dataset, transfer
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, группами, '
+            'постами, комментариями и подписками для нагрузочных замеров.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--posts', type=int, default=10_000_000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--follows-per-user', type=int, default=20)
+        parser.add_argument('--comments-per-post', type=float, default=0.5)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int,
+                            default=transfer.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        def report(kind, count):
+            nonlocal started
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'{kind}: {count} за {elapsed:.1f} с '
+                f'({count / max(elapsed, 1e-6):.0f} строк/с)')
+            started = time.monotonic()
+
+        dataset.generate(
+            users=options['users'],
+            posts=options['posts'],
+            groups=options['groups'],
+            follows_per_user=options['follows_per_user'],
+            comments_per_post=options['comments_per_post'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            report=report,
+        )
+        transfer.rebuild_derived()
+        self.stdout.write(self.style.SUCCESS(
+            'Счётчики, ленты и поисковый индекс пересобраны за '
+            f'{time.monotonic() - started:.1f} с'))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Выгружает пользователей, группы, посты, комментарии или подписки.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=transfer.KINDS)
+        parser.add_argument('--format', choices=transfer.FORMATS,
+                            default='ndjson')
+        parser.add_argument('--output', default='-',
+                            help='Файл для выгрузки; «-» — stdout.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rows = transfer.export_rows(options['kind'])
+        if options['output'] == '-':
+            # OutputWrapper дописывал бы перевод строки к каждой записи.
+            written = transfer.write_rows(
+                rows, self.stdout._out, options['kind'], options['format'])
+            report = self.stderr
+        else:
+            with open(options['output'], 'w', encoding='utf-8',
+                      newline='') as stream:
+                written = transfer.write_rows(
+                    rows, stream, options['kind'], options['format'])
+            report = self.stdout
+        elapsed = time.monotonic() - started
+        report.write(self.style.SUCCESS(
+            f'Выгружено строк: {written} за {elapsed:.1f} с '
+            f'({written / max(elapsed, 1e-6):.0f} строк/с)'))
@@ -0,0 +1,169 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:31
+
+import re
+import sqlite3
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Копия posts.search на момент миграции: миграция не должна зависеть от
+# того, как модуль поиска поменяется потом.
+FTS_TABLE = 'posts_search'
+TEXT_WEIGHT = 2
+COMMENT_WEIGHT = 1
+TERM_LENGTH = 64
+
+STOP_WORDS = frozenset((
+    'а', 'без', 'бы', 'в', 'во', 'да', 'для', 'до', 'же', 'за', 'и', 'из',
+    'или', 'к', 'ко', 'ли', 'на', 'над', 'не', 'ни', 'но', 'о', 'об', 'от',
+    'по', 'под', 'при', 'с', 'со', 'то', 'у', 'что', 'это',
+))
+
+WORD = re.compile(r'[^\W_]+')
+CYRILLIC = re.compile(r'[а-я]')
+RV = re.compile(r'^(.*?[аеиоуыэюя])(.*)$')
+PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$')
+REFLEXIVE = re.compile(r'(с[яь])$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|'
+    r'ую|юю|ая|яя|ою|ею)$')
+PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено|'
+    r'ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)|'
+    r'((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$')
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|'
+    r'ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$')
+DERIVATIONAL = re.compile(r'.*[^аеиоуыэюя]+[аеиоуыэюя].*ость?$')
+DERIVATIONAL_ENDING = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+
+
+def stem(word):
+    match = RV.match(word)
+    if match is None:
+        return word
+    start, rv = match.groups()
+    without = PERFECTIVE_GERUND.sub('', rv, 1)
+    if without == rv:
+        rv = REFLEXIVE.sub('', rv, 1)
+        without = ADJECTIVE.sub('', rv, 1)
+        if without != rv:
+            rv = PARTICIPLE.sub('', without, 1)
+        else:
+            without = VERB.sub('', rv, 1)
+            rv = NOUN.sub('', rv, 1) if without == rv else without
+    else:
+        rv = without
+    rv = re.sub('и$', '', rv, 1)
+    if DERIVATIONAL.match(rv):
+        rv = DERIVATIONAL_ENDING.sub('', rv, 1)
+    without = re.sub('ь$', '', rv, 1)
+    if without == rv:
+        rv = SUPERLATIVE.sub('', rv, 1)
+        rv = re.sub('нн$', 'н', rv, 1)
+    else:
+        rv = without
+    return start + rv
+
+
+def tokenize(text):
+    terms = []
+    for word in WORD.findall(text.lower().replace('ё', 'е')):
+        if word in STOP_WORDS:
+            continue
+        if CYRILLIC.search(word):
+            word = stem(word)
+        terms.append(word[:TERM_LENGTH])
+    return terms
+
+
+def use_fts5(connection):
+    backend = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    if backend != 'auto':
+        return backend == 'fts5'
+    if connection.vendor != 'sqlite':
+        return False
+    probe = sqlite3.connect(':memory:')
+    try:
+        probe.execute('CREATE VIRTUAL TABLE probe USING fts5(text)')
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        probe.close()
+    return True
+
+
+def weights(text_terms, comment_terms):
+    result = {}
+    for term in text_terms:
+        result[term] = result.get(term, 0) + TEXT_WEIGHT
+    for term in comment_terms:
+        result[term] = result.get(term, 0) + COMMENT_WEIGHT
+    return result
+
+
+def create_index(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    SearchToken = apps.get_model('posts', 'SearchToken')
+    documents = {
+        pk: (tokenize(text), [])
+        for pk, text in Post.objects.values_list('pk', 'text')
+    }
+    for post_id, text in Comment.objects.values_list('post_id', 'text'):
+        documents[post_id][1].extend(tokenize(text))
+    if not use_fts5(schema_editor.connection):
+        SearchToken.objects.bulk_create(
+            SearchToken(post_id=pk, term=term, weight=weight)
+            for pk, document in documents.items()
+            for term, weight in weights(*document).items()
+        )
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+            "text, comments, tokenize='unicode61 remove_diacritics 0')"
+        )
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, text, comments) '
+            'VALUES (%s, %s, %s)',
+            [(pk, ' '.join(text), ' '.join(comments))
+             for pk, (text, comments) in documents.items()],
+        )
+
+
+def drop_index(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Основа слова')),
+                ('weight', models.PositiveIntegerField(default=1, verbose_name='Вес')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Слово индекса',
+                'verbose_name_plural': 'Слова индекса',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchtoken',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_search_term_post'),
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 08:10
+
+from django.db import migrations, models
+from django.db.models import Count
+
+# Копия posts.timeline.CELEBRITY_FOLLOWERS на момент миграции.
+CELEBRITY_FOLLOWERS = 1000
+
+
+def mark_pulled_posts(apps, schema_editor):
+    # Посты популярных авторов не раскладывались в ленты (см. 0012).
+    Follow = apps.get_model('posts', 'Follow')
+    celebrities = Follow.objects.values('author_id').annotate(
+        followers=Count('id')).filter(
+        followers__gt=CELEBRITY_FOLLOWERS).values('author_id')
+    apps.get_model('posts', 'Post').objects.filter(
+        author_id__in=celebrities).update(fanned_out=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_edit_revisions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='fanned_out',
+            field=models.BooleanField(default=True, editable=False, verbose_name='Разложен по лентам'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(fanned_out=False), fields=['author', '-pub_date', '-id'], name='post_not_fanned_out'),
+        ),
+        migrations.RunPython(mark_pulled_posts, migrations.RunPython.noop),
+    ]
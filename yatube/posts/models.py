@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -10,11 +11,38 @@ class Group(models.Model):
     title = models.CharField(max_length=200, unique=True, null=True)
     slug = models.SlugField(max_length=100, unique=True)
     description = models.TextField(max_length=2000, blank=True, null=True)
+    posts_count = models.PositiveIntegerField(
+        'Число постов',
+        default=0,
+        editable=False
+    )
 
     def __str__(self):
         return self.title
 
 
+FEED_FIELDS = (
+    'text', 'pub_date', 'image', 'thumbnail', 'author_id', 'group_id',
+    'author__username', 'author__first_name', 'author__last_name',
+    'group__title', 'group__slug',
+)
+
+
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Посты для лент: автор и группа одним JOIN, только нужные поля."""
+        return self.select_related('author', 'group').only(
+            *FEED_FIELDS).prefetch_related('image_variants')
+
+    def detail(self):
+        """Пост для отдельной страницы вместе со счётчиками автора.
+
+        Варианты картинки догружаются во view, когда страница точно
+        будет отрисована, а не отдана ответом 304.
+        """
+        return self.select_related('author__counters', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
@@ -46,6 +74,34 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    thumbnail = models.ImageField(
+        'Миниатюра',
+        upload_to='posts/thumbs/',
+        blank=True,
+        editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        default=timezone.now,
+        editable=False
+    )
+    revision = models.PositiveIntegerField(
+        'Ревизия',
+        default=1,
+        editable=False
+    )
+    fanned_out = models.BooleanField(
+        'Разложен по лентам',
+        default=True,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return self.text[:NUM_OF_CHAR]
@@ -54,6 +110,46 @@ class Post(models.Model):
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         condition=models.Q(fanned_out=False),
+                         name='post_not_fanned_out'),
+        ]
+
+
+class PostImageVariant(models.Model):
+    """Уменьшенная копия картинки поста заданной ширины и формата."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='image_variants',
+        verbose_name='Пост'
+    )
+    width = models.PositiveIntegerField('Ширина')
+    height = models.PositiveIntegerField('Высота')
+    format = models.CharField('Формат', max_length=10)
+    image = models.FileField('Файл', upload_to='posts/variants/')
+
+    class Meta:
+        ordering = ['post_id', 'format', 'width']
+        verbose_name = 'Вариант картинки'
+        verbose_name_plural = 'Варианты картинок'
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'format', 'width'],
+                                    name='unique_post_image_variant')
+        ]
+
+
+class CommentQuerySet(models.QuerySet):
+    def thread(self):
+        """Комментарии в порядке публикации, автор одним JOIN."""
+        return self.select_related('author').only(
+            'post_id', 'text', 'created', 'author_id', 'author__username'
+        ).order_by('created', 'pk')
 
 
 class Comment(models.Model):
@@ -78,10 +174,26 @@ class Comment(models.Model):
         'Дата и время публикации',
         auto_now_add=True
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        default=timezone.now,
+        editable=False
+    )
+    revision = models.PositiveIntegerField(
+        'Ревизия',
+        default=1,
+        editable=False
+    )
+
+    objects = CommentQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created'),
+        ]
 
     def __str__(self):
         return self.text
@@ -106,3 +218,86 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=['user', 'author'],
                                     name='unique_author_user_following')
         ]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user'),
+        ]
+
+
+class Timeline(models.Model):
+    """Материализованная лента подписок: пост в ленте читателя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор поста'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ['-pub_date']
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_user_post')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_pub_date'),
+            models.Index(fields=['user', 'author'],
+                         name='timeline_user_author'),
+        ]
+
+
+class UserCounter(models.Model):
+    """Счётчики пользователя, которые иначе считались бы через COUNT(*)."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0
+    )
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+
+class SearchToken(models.Model):
+    """Запись инвертированного индекса: основа слова и пост, где она есть."""
+    term = models.CharField('Основа слова', max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_tokens',
+        verbose_name='Пост'
+    )
+    weight = models.PositiveIntegerField('Вес', default=1)
+
+    class Meta:
+        verbose_name = 'Слово индекса'
+        verbose_name_plural = 'Слова индекса'
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'post'],
+                                    name='unique_search_term_post')
+        ]
@@ -0,0 +1,277 @@
+"""Полнотекстовый поиск по постам и комментариям к ним.
+
+Слова приводятся к основе стеммером Портера для русского языка, а
+индекс хранится либо в виртуальной таблице SQLite FTS5 (ранжирование
+по BM25), либо, если FTS5 недоступен, в таблице ``SearchToken``
+(ранжирование по сумме весов совпавших слов). Индекс поста
+пересобирается фоновой задачей при правке его текста, а комментарий
+меняет в индексе только свои слова, не трогая остальную ветку.
+"""
+import functools
+import re
+import sqlite3
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Sum
+
+from .models import Comment, Post, SearchToken
+
+FTS_TABLE = 'posts_search'
+MAX_RESULTS = 500
+TEXT_WEIGHT = 2
+COMMENT_WEIGHT = 1
+TERM_LENGTH = 64
+
+STOP_WORDS = frozenset((
+    'а', 'без', 'бы', 'в', 'во', 'да', 'для', 'до', 'же', 'за', 'и', 'из',
+    'или', 'к', 'ко', 'ли', 'на', 'над', 'не', 'ни', 'но', 'о', 'об', 'от',
+    'по', 'под', 'при', 'с', 'со', 'то', 'у', 'что', 'это',
+))
+
+WORD = re.compile(r'[^\W_]+')
+CYRILLIC = re.compile(r'[а-я]')
+RV = re.compile(r'^(.*?[аеиоуыэюя])(.*)$')
+PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$')
+REFLEXIVE = re.compile(r'(с[яь])$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|'
+    r'ую|юю|ая|яя|ою|ею)$')
+PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено|'
+    r'ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)|'
+    r'((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$')
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|'
+    r'ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$')
+DERIVATIONAL = re.compile(r'.*[^аеиоуыэюя]+[аеиоуыэюя].*ость?$')
+DERIVATIONAL_ENDING = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+
+
+@functools.lru_cache(maxsize=100_000)
+def stem(word):
+    """Основа русского слова по алгоритму Портера (Snowball).
+
+    Словарь живого текста невелик, поэтому основы кэшируются.
+    """
+    match = RV.match(word)
+    if match is None:
+        return word
+    start, rv = match.groups()
+    without = PERFECTIVE_GERUND.sub('', rv, 1)
+    if without == rv:
+        rv = REFLEXIVE.sub('', rv, 1)
+        without = ADJECTIVE.sub('', rv, 1)
+        if without != rv:
+            rv = PARTICIPLE.sub('', without, 1)
+        else:
+            without = VERB.sub('', rv, 1)
+            rv = NOUN.sub('', rv, 1) if without == rv else without
+    else:
+        rv = without
+    rv = re.sub('и$', '', rv, 1)
+    if DERIVATIONAL.match(rv):
+        rv = DERIVATIONAL_ENDING.sub('', rv, 1)
+    without = re.sub('ь$', '', rv, 1)
+    if without == rv:
+        rv = SUPERLATIVE.sub('', rv, 1)
+        rv = re.sub('нн$', 'н', rv, 1)
+    else:
+        rv = without
+    return start + rv
+
+
+def tokenize(text):
+    """Основы значимых слов текста в порядке появления."""
+    terms = []
+    for word in WORD.findall(text.lower().replace('ё', 'е')):
+        if word in STOP_WORDS:
+            continue
+        if CYRILLIC.search(word):
+            word = stem(word)
+        terms.append(word[:TERM_LENGTH])
+    return terms
+
+
+@functools.lru_cache(maxsize=None)
+def fts5_supported():
+    """Собран ли SQLite с модулем FTS5."""
+    probe = sqlite3.connect(':memory:')
+    try:
+        probe.execute('CREATE VIRTUAL TABLE probe USING fts5(text)')
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        probe.close()
+    return True
+
+
+def get_backend():
+    """``'fts5'`` или ``'python'`` с учётом SEARCH_BACKEND."""
+    backend = settings.SEARCH_BACKEND
+    if backend == 'auto':
+        fts5 = connection.vendor == 'sqlite' and fts5_supported()
+        return 'fts5' if fts5 else 'python'
+    return backend
+
+
+def create_fts_table(cursor):
+    cursor.execute(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+        "text, comments, tokenize='unicode61 remove_diacritics 0')"
+    )
+
+
+def _documents(post_ids):
+    """Основы слов текста и комментариев каждого поста."""
+    documents = {
+        pk: (tokenize(text), [])
+        for pk, text in Post.objects.filter(
+            pk__in=post_ids).values_list('pk', 'text')
+    }
+    comments = Comment.objects.filter(post_id__in=post_ids).values_list(
+        'post_id', 'text')
+    for post_id, text in comments:
+        documents[post_id][1].extend(tokenize(text))
+    return documents
+
+
+def _weights(text_terms, comment_terms):
+    weights = {}
+    for term in text_terms:
+        weights[term] = weights.get(term, 0) + TEXT_WEIGHT
+    for term in comment_terms:
+        weights[term] = weights.get(term, 0) + COMMENT_WEIGHT
+    return weights
+
+
+def remove(post_ids):
+    if get_backend() == 'fts5':
+        placeholders = ', '.join(['%s'] * len(post_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})',
+                list(post_ids),
+            )
+    else:
+        SearchToken.objects.filter(post_id__in=post_ids).delete()
+
+
+def index(post_ids):
+    """Пересобирает индекс постов; удалённые посты из индекса убираются."""
+    post_ids = list(post_ids)
+    if not post_ids:
+        return
+    documents = _documents(post_ids)
+    remove(post_ids)
+    if get_backend() == 'fts5':
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, text, comments) '
+                'VALUES (%s, %s, %s)',
+                [(pk, ' '.join(text), ' '.join(comments))
+                 for pk, (text, comments) in documents.items()],
+            )
+        return
+    SearchToken.objects.bulk_create(
+        SearchToken(post_id=pk, term=term, weight=weight)
+        for pk, document in documents.items()
+        for term, weight in _weights(*document).items()
+    )
+
+
+def index_comment(post_id, removed='', added=''):
+    """Меняет в индексе поста слова комментария: ``removed`` на ``added``.
+
+    Остальные комментарии поста не читаются и не разбираются заново.
+    """
+    removed, added = tokenize(removed), tokenize(added)
+    if not removed and not added:
+        return
+    if get_backend() == 'fts5':
+        with connection.cursor() as cursor:
+            if not removed:
+                cursor.execute(
+                    f"UPDATE {FTS_TABLE} SET comments = comments || ' ' || %s "
+                    'WHERE rowid = %s',
+                    [' '.join(added), post_id],
+                )
+                return
+            cursor.execute(
+                f'SELECT comments FROM {FTS_TABLE} WHERE rowid = %s',
+                [post_id])
+            row = cursor.fetchone()
+            if row is None:
+                return
+            terms = Counter(row[0].split())
+            terms.subtract(removed)
+            terms.update(added)
+            cursor.execute(
+                f'UPDATE {FTS_TABLE} SET comments = %s WHERE rowid = %s',
+                [' '.join(terms.elements()), post_id],
+            )
+        return
+    deltas = Counter()
+    for term in added:
+        deltas[term] += COMMENT_WEIGHT
+    for term in removed:
+        deltas[term] -= COMMENT_WEIGHT
+    deltas = {term: delta for term, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    tokens = {token.term: token for token in SearchToken.objects.filter(
+        post_id=post_id, term__in=deltas)}
+    for token in tokens.values():
+        token.weight += deltas[token.term]
+    SearchToken.objects.bulk_update(
+        [token for token in tokens.values() if token.weight > 0], ['weight'])
+    SearchToken.objects.filter(pk__in=[
+        token.pk for token in tokens.values() if token.weight <= 0]).delete()
+    SearchToken.objects.bulk_create(
+        SearchToken(post_id=post_id, term=term, weight=delta)
+        for term, delta in deltas.items()
+        if term not in tokens and delta > 0
+    )
+
+
+def rebuild(batch_size=500):
+    """Строит индекс всех постов заново."""
+    if get_backend() == 'fts5':
+        with connection.cursor() as cursor:
+            create_fts_table(cursor)
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    else:
+        SearchToken.objects.all().delete()
+    post_ids = list(Post.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(post_ids), batch_size):
+        index(post_ids[start:start + batch_size])
+
+
+def search_ids(query, limit=MAX_RESULTS):
+    """Id постов, где есть все слова запроса, от лучшего совпадения."""
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return []
+    if get_backend() == 'fts5':
+        match = ' '.join('"{}"'.format(term.replace('"', '""'))
+                         for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, {TEXT_WEIGHT}, {COMMENT_WEIGHT}),'
+                ' rowid DESC LIMIT %s',
+                [match, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+    return list(
+        SearchToken.objects.filter(term__in=terms)
+        .values('post_id')
+        .annotate(matched=Count('term'), score=Sum('weight'))
+        .filter(matched=len(terms))
+        .order_by('-score', '-post_id')
+        .values_list('post_id', flat=True)[:limit]
+    )
@@ -0,0 +1,103 @@
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import counters, follows, invalidation, search, tasks, thumbnails
+from .models import Comment, Follow, Post, User, UserCounter
+
+
+@receiver(post_save, sender=User)
+def create_user_counter(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserCounter.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Comment)
+def remember_previous(sender, instance, **kwargs):
+    invalidation.remember(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous', None)
+    if created or previous is None:
+        counters.change_user(instance.author_id, 'posts_count', 1)
+        counters.change_group(instance.group_id, 1)
+        return
+    if previous['author_id'] != instance.author_id:
+        counters.change_user(previous['author_id'], 'posts_count', -1)
+        counters.change_user(instance.author_id, 'posts_count', 1)
+    if previous['group_id'] != instance.group_id:
+        counters.change_group(previous['group_id'], -1)
+        counters.change_group(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, 'posts_count', -1)
+    counters.change_group(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.change_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    """Подписки через ORM; ``follows`` меняет всё то же без сигналов."""
+    if created:
+        follows.changed(instance.user_id, [instance.author_id], 1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    follows.changed(instance.user_id, [instance.author_id], -1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        tasks.fan_out.delay(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_saved_post(sender, instance, created, raw=False, **kwargs):
+    invalidation.dispatch(invalidation.post_saved(instance, created),
+                          reindex=not raw)
+
+
+@receiver(pre_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    # До удаления комментариев поста: им не остаётся что править в индексе.
+    search.remove([instance.pk])
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post(sender, instance, **kwargs):
+    invalidation.dispatch(invalidation.post_deleted(instance), reindex=False)
+
+
+@receiver(post_save, sender=Comment)
+def invalidate_saved_comment(sender, instance, created, raw=False,
+                             **kwargs):
+    invalidation.dispatch(invalidation.comment_saved(instance, created),
+                          reindex=not raw)
+
+
+@receiver(post_delete, sender=Comment)
+def invalidate_deleted_comment(sender, instance, **kwargs):
+    invalidation.dispatch(invalidation.comment_deleted(instance))
+
+
+@receiver(post_save, sender=Post)
+def refresh_thumbnail(sender, instance, raw=False, **kwargs):
+    if not raw:
+        thumbnails.refresh(instance)
@@ -0,0 +1,47 @@
+"""Фоновые задачи posts: работа после записи, которой не место в ответе.
+
+Счётчики и поколения кэша меняются в самом запросе: это по одному
+быстрому запросу, и страница сразу после записи должна их учитывать.
+"""
+from core.jobs import task
+
+from . import caching, search, timeline
+from .models import Follow, Post
+
+FEED_PRIORITY = 10
+
+
+@task(priority=FEED_PRIORITY)
+def fan_out(post_id):
+    """Раскладывает новый пост в ленты подписчиков автора."""
+    post = Post.objects.filter(pk=post_id).only(
+        'pub_date', 'author_id').first()
+    if post is None:
+        return
+    timeline.fan_out(post)
+    # Ленты подписок могли закэшироваться раньше, чем пост в них попал.
+    caching.bump_on_commit(caching.ALL_POSTS)
+
+
+@task(priority=FEED_PRIORITY)
+def sync_follow(user_id, *author_ids):
+    """Приводит ленту читателя в соответствие с подписками на авторов.
+
+    Подписка и отписка ставят одну и ту же задачу, поэтому порядок, в
+    котором воркеры их выполнят, не важен.
+    """
+    followed = set(Follow.objects.filter(
+        user_id=user_id, author_id__in=author_ids,
+    ).values_list('author_id', flat=True))
+    for author_id in author_ids:
+        if author_id in followed:
+            timeline.backfill(user_id, author_id)
+        else:
+            timeline.prune(user_id, author_id)
+    caching.bump_on_commit(caching.follow_scope(user_id))
+
+
+@task()
+def index_posts(post_ids):
+    """Пересобирает поисковый индекс постов, удалённые из него убирает."""
+    search.index(post_ids)
@@ -0,0 +1,22 @@
+from django import template
+
+register = template.Library()
+
+SIZES = '(max-width: 960px) 100vw, 960px'
+
+
+@register.inclusion_tag('includes/picture.html')
+def post_picture(post):
+    """Адаптивная картинка поста: <picture> с srcset по форматам."""
+    srcsets = {}
+    for variant in post.image_variants.all():
+        srcsets.setdefault(variant.format, []).append(
+            f'{variant.image.url} {variant.width}w')
+    fallback = srcsets.pop('jpeg', [])
+    return {
+        'post': post,
+        'sources': [(f'image/{name}', ', '.join(srcsets[name]))
+                    for name in ('avif', 'webp') if name in srcsets],
+        'srcset': ', '.join(fallback),
+        'sizes': SIZES,
+    }
@@ -0,0 +1,45 @@
+"""Теги фрагментов, которые зависят от читателя страницы (см. core.holes)."""
+from django import template
+
+from posts import follows
+from posts.forms import CommentForm
+from posts.models import Follow
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def is_following(context, username):
+    """Подписан ли текущий пользователь на автора ``username``."""
+    return Follow.objects.filter(
+        user=context['user'], author__username=username).exists()
+
+
+@register.simple_tag(takes_context=True)
+def follows_author(context, author_id, authors):
+    """Подписан ли читатель на автора поста из ленты.
+
+    Первый вызов в запросе узнаёт подписки сразу на всех авторов страницы
+    ``authors`` и запоминает их, так что фрагменты всех постов ленты
+    обходятся одним запросом.
+    """
+    request = context['request']
+    known = getattr(request, '_following_authors', None)
+    if known is None:
+        known = request._following_authors = {}
+    if author_id not in known:
+        authors = [*authors, author_id]
+        followed = follows.following_ids(context['user'].pk, authors)
+        known.update((pk, pk in followed) for pk in authors)
+    return known[author_id]
+
+
+@register.filter
+def author_ids(posts):
+    """Id авторов постов страницы для ``follows_author``."""
+    return list(dict.fromkeys(post.author_id for post in posts))
+
+
+@register.simple_tag
+def comment_form():
+    return CommentForm()
@@ -0,0 +1,70 @@
+import tracemalloc
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import benchmark, dataset
+from ..models import Comment, Follow, Group, Post, Timeline, User
+
+
+class DatasetTest(TestCase):
+    def test_generate_is_deterministic_power_law(self):
+        options = dict(users=50, posts=200, groups=3, follows_per_user=6,
+                       comments_per_post=1)
+        call_command('generate_dataset', stdout=StringIO(), **options)
+        self.assertEqual(User.objects.count(), 50)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertTrue(Comment.objects.exists())
+        self.assertTrue(Timeline.objects.exists())
+        first = User.objects.order_by('pk').first()
+        last = User.objects.order_by('pk').last()
+        self.assertGreater(Follow.objects.filter(author=first).count(),
+                           Follow.objects.filter(author=last).count())
+
+        follows = list(Follow.objects.values_list('user_id', 'author_id'))
+        User.objects.all().delete()
+        dataset.generate(**options)
+        self.assertEqual(
+            list(Follow.objects.values_list('user_id', 'author_id')), follows)
+
+
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        dataset.generate(users=20, posts=40, groups=2, follows_per_user=4)
+
+    def test_every_page_is_measured(self):
+        results = benchmark.run(requests=2, warmup=1, memory=True)
+        self.assertEqual(set(results['urls']), set(benchmark.NAMES))
+        for name, result in results['urls'].items():
+            with self.subTest(name=name):
+                self.assertEqual(result['errors'], 0)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+                self.assertIn('memory_p95_kb', result)
+        self.assertEqual(results['meta']['dataset']['posts'], 40)
+
+    @mock.patch.object(tracemalloc, 'reset_peak', None, create=True)
+    def test_memory_without_reset_peak(self):
+        """На Python до 3.9 без tracemalloc.reset_peak память тоже меряется."""
+        results = benchmark.run(names=['index'], requests=2, warmup=0,
+                                memory=True)
+        self.assertGreater(results['urls']['index']['memory_p95_kb'], 0)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([7], 95), 7)
+
+    def test_requests_leave_data_unchanged(self):
+        """Подписки и отписки замеров откатываются, как и POST."""
+        follows = set(Follow.objects.values_list('user_id', 'author_id'))
+        timeline = Timeline.objects.count()
+        benchmark.run(requests=3, names=['profile_follow',
+                                         'profile_unfollow'])
+        self.assertEqual(
+            set(Follow.objects.values_list('user_id', 'author_id')), follows)
+        self.assertEqual(Timeline.objects.count(), timeline)
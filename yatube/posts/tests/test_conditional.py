@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(author=cls.author, text='Пост',
+                                       group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, url):
+        etag = self.client.get(url)['ETag']
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_pages_answer_not_modified(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.revalidate(url)
+                self.assertEqual(response.status_code, 304)
+                self.assertTrue(response.has_header('Last-Modified'))
+
+    def test_index_not_modified_without_queries(self):
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_not_modified_before_comments(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_changes_make_pages_stale(self):
+        changes = (
+            (reverse('posts:index'), lambda: Post.objects.create(
+                author=self.reader, text='Новый')),
+            (reverse('posts:post_detail', args=[self.post.pk]),
+             lambda: Comment.objects.create(post=self.post,
+                                            author=self.reader, text='Да')),
+            (reverse('posts:profile', args=[self.author.username]),
+             lambda: Follow.objects.create(user=self.reader,
+                                           author=self.author)),
+        )
+        for url, change in changes:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                change()
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    @override_settings(PROXY_CACHE_SECONDS=45)
+    def test_anonymous_pages_cacheable_by_proxy(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('s-maxage=45', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_user_pages_private(self):
+        url = reverse('posts:index')
+        anonymous_etag = self.client.get(url)['ETag']
+        self.client.force_login(self.reader)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=anonymous_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_follow_makes_feeds_stale(self):
+        """Ссылки подписки на авторов в лентах меняют ETag читателя."""
+        self.client.force_login(self.reader)
+        for url in (reverse('posts:index'),
+                    reverse('posts:group_posts', args=[self.group.slug])):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                self.client.get(reverse('posts:profile_follow',
+                                        args=[self.author.username]))
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'отписаться от автора')
+                self.client.get(reverse('posts:profile_unfollow',
+                                        args=[self.author.username]))
@@ -0,0 +1,129 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import capture_on_commit_callbacks
+
+from .. import caching, follows
+from ..models import Follow, Post, Timeline, UserCounter
+
+User = get_user_model()
+
+
+class FollowsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [User.objects.create_user(username=f'author{i}')
+                       for i in range(3)]
+        cls.author = cls.authors[0]
+
+    def counters(self, user):
+        return UserCounter.objects.get(user=user)
+
+    def test_follow_once(self):
+        """Повторная подписка ничего не меняет и не падает."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.assertTrue(follows.follow(self.reader.pk, self.author.pk))
+        self.assertFalse(follows.follow(self.reader.pk, self.author.pk))
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(self.counters(self.reader).following_count, 1)
+        self.assertEqual(self.counters(self.author).followers_count, 1)
+        self.assertEqual(
+            list(Timeline.objects.filter(user=self.reader)
+                 .values_list('post_id', flat=True)), [post.pk])
+
+    def test_follow_many_skips_self_and_unknown(self):
+        pks = [author.pk for author in self.authors]
+        follows.follow(self.reader.pk, pks[0])
+        created = follows.follow_many(
+            self.reader.pk, [*pks, pks[1], self.reader.pk, 10 ** 6])
+        self.assertCountEqual(created, pks[1:])
+        self.assertEqual(self.counters(self.reader).following_count, 3)
+        for author in self.authors:
+            with self.subTest(author=author.username):
+                self.assertEqual(self.counters(author).followers_count, 1)
+
+    def test_unfollow_many(self):
+        """Отписка считает только подписки, которые действительно были."""
+        pks = [author.pk for author in self.authors]
+        Post.objects.create(author=self.author, text='Пост')
+        follows.follow_many(self.reader.pk, pks[:2])
+        self.assertCountEqual(follows.unfollow_many(self.reader.pk, pks),
+                              pks[:2])
+        self.assertFalse(follows.unfollow(self.reader.pk, pks[0]))
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(Timeline.objects.exists())
+        self.assertEqual(self.counters(self.reader).following_count, 0)
+        self.assertEqual(self.counters(self.author).followers_count, 0)
+
+    @override_settings(ON_COMMIT_EAGER=False)
+    def test_generations_bumped_after_commit(self):
+        """Поколения растут после фиксации, когда подписка уже видна."""
+        scope = caching.follow_scope(self.reader.pk)
+        before = caching.get_generations(scope)
+        with capture_on_commit_callbacks() as callbacks:
+            follows.follow(self.reader.pk, self.author.pk)
+            self.assertEqual(caching.get_generations(scope), before)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(caching.get_generations(scope), before)
+
+    def test_lookups_take_one_query(self):
+        pks = [author.pk for author in self.authors]
+        follows.follow_many(self.reader.pk, pks[:2])
+        follows.follow(self.author.pk, self.reader.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(follows.following_ids(self.reader.pk, pks),
+                             set(pks[:2]))
+        with self.assertNumQueries(1):
+            self.assertEqual(follows.mutual_ids(self.reader.pk, pks),
+                             {self.author.pk})
+        self.assertTrue(follows.is_mutual(self.author.pk, self.reader.pk))
+        self.assertFalse(follows.is_mutual(self.reader.pk, pks[1]))
+        with self.assertNumQueries(0):
+            self.assertEqual(follows.following_ids(None, pks), set())
+
+
+@mock.patch.object(follows, '_returning', lambda: False)
+class FollowsWithoutReturningTest(FollowsTest):
+    """То же на SQLite до 3.35, где нет INSERT и DELETE ... RETURNING."""
+
+
+@override_settings(PAGE_CACHE_SECONDS=0)
+class FollowViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [User.objects.create_user(username=f'author{i}')
+                       for i in range(3)]
+        for author in cls.authors:
+            Post.objects.create(author=author, text=f'Пост {author}')
+        Follow.objects.create(user=cls.reader, author=cls.authors[0])
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def test_unfollow_unknown_author(self):
+        response = self.client.get(
+            reverse('posts:profile_unfollow', args=['nobody']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_feed_shows_follow_state_per_author(self):
+        """Состояние подписки на авторов ленты узнаётся одним запросом."""
+        url = reverse('posts:index')
+        with self.assertNumQueries(5):
+            content = self.client.get(url).content.decode()
+        self.assertEqual(content.count('отписаться от автора'), 1)
+        self.assertEqual(content.count('подписаться на автора'), 2)
+        self.assertIn(
+            reverse('posts:profile_unfollow', args=['author0']), content)
+
+    def test_api_profile_mutual(self):
+        Follow.objects.create(user=self.authors[0], author=self.reader)
+        data = self.client.get(
+            reverse('api:profile', args=['author0'])).json()
+        self.assertTrue(data['following'])
+        self.assertTrue(data['mutual'])
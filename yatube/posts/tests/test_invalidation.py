@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import capture_on_commit_callbacks
+
+from .. import caching, search
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class InvalidationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other_group = Group.objects.create(title='Другая', slug='other')
+        cls.post = Post.objects.create(author=cls.author, text='Пост',
+                                       group=cls.group)
+        cls.comment = Comment.objects.create(post=cls.post, author=cls.author,
+                                             text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.scopes = [
+            caching.ALL_POSTS,
+            caching.post_scope(self.post.pk),
+            caching.author_scope(self.author.pk),
+            caching.group_scope(self.group.pk),
+            caching.group_scope(self.other_group.pk),
+        ]
+
+    def generations(self):
+        return dict(zip(self.scopes, caching.get_generations(*self.scopes)))
+
+    def changed(self, action):
+        before = self.generations()
+        action()
+        after = self.generations()
+        return {scope for scope in self.scopes
+                if before[scope] != after[scope]}
+
+    def test_edit_raises_revision(self):
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Правка'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.revision, 2)
+        self.assertGreater(post.updated_at, post.pub_date)
+
+    @override_settings(ON_COMMIT_EAGER=False)
+    def test_purge_after_commit(self):
+        """Поколения и индекс меняются, только когда правка видна всем."""
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Попугай'
+        with capture_on_commit_callbacks() as callbacks:
+            with transaction.atomic():
+                self.assertEqual(self.changed(post.save), set())
+            self.assertEqual(search.search_ids('попугай'), [])
+        before = self.generations()
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(self.generations()[self.scopes[1]],
+                            before[self.scopes[1]])
+        self.assertEqual(search.search_ids('попугай'), [post.pk])
+
+    def test_save_without_changes_purges_nothing(self):
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(self.changed(post.save), set())
+        post.refresh_from_db()
+        self.assertEqual(post.revision, 1)
+
+    def test_edit_purges_post_pages(self):
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Правка'
+        self.assertEqual(self.changed(post.save), set(self.scopes[:4]))
+        self.assertIn(post.pk, search.search_ids('правка'))
+
+    def test_group_move_purges_both_groups(self):
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.other_group
+        self.assertEqual(self.changed(post.save), set(self.scopes))
+
+    def test_comment_edit_purges_only_post(self):
+        comment = Comment.objects.get(pk=self.comment.pk)
+        comment.text = 'Исправленный'
+        self.assertEqual(self.changed(comment.save),
+                         {caching.post_scope(self.post.pk)})
+        comment.refresh_from_db()
+        self.assertEqual(comment.revision, 2)
+        self.assertIn(self.post.pk, search.search_ids('исправленный'))
+
+    def test_unchanged_edit_form_keeps_pages(self):
+        self.client.force_login(self.author)
+        url = reverse('posts:post_edit', args=[self.post.pk])
+        data = {'text': self.post.text, 'group': self.group.pk}
+        self.assertEqual(
+            self.changed(lambda: self.client.post(url, data)), set())
@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import conditional
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(author=cls.author, text='Пост',
+                                       group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_anonymous_page_from_cache(self):
+        url = reverse('posts:index')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertContains(response, 'Пост')
+        self.assertContains(response, 'Войти')
+
+    def test_unused_params_share_page(self):
+        """Лишние параметры адреса не создают новых записей в кэше."""
+        url = reverse('posts:index')
+        with mock.patch.object(conditional, 'get_or_build',
+                               wraps=conditional.get_or_build) as cached:
+            for params in ({'x': 1}, {'x': 2}, {'page': 2},
+                           {'page': 2, 'x': 3}):
+                self.client.get(url, params)
+        keys = [args[0] for args, _ in cached.call_args_list]
+        self.assertEqual(keys[0], keys[1])
+        self.assertNotEqual(keys[1], keys[2])
+        self.assertEqual(keys[2], keys[3])
+
+    def test_users_share_page_with_own_fragments(self):
+        url = reverse('posts:profile', args=[self.author.username])
+        self.client.get(url)
+        response = self.reader_client.get(url)
+        self.assertTemplateNotUsed(response, 'posts/profile.html')
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertContains(response, 'Подписаться')
+        response = self.author_client.get(url)
+        self.assertContains(response, 'Пользователь: author')
+        self.assertNotContains(response, 'Подписаться')
+
+    def test_detail_fragments(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        edit = reverse('posts:post_edit', args=[self.post.pk])
+        comment = reverse('posts:add_comment', args=[self.post.pk])
+        response = self.client.get(url)
+        self.assertNotContains(response, edit)
+        self.assertNotContains(response, comment)
+        response = self.reader_client.get(url)
+        self.assertNotContains(response, edit)
+        self.assertContains(response, comment)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        response = self.author_client.get(url)
+        self.assertContains(response, edit)
+
+    def test_follow_changes_button(self):
+        url = reverse('posts:profile', args=[self.author.username])
+        self.assertContains(self.reader_client.get(url), 'Подписаться')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertContains(self.reader_client.get(url), 'Отписаться')
+
+    def test_new_post_refreshes_pages(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+        )
+        for url in urls:
+            self.client.get(url)
+        Post.objects.create(author=self.author, text='Свежий',
+                            group=self.group)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Свежий')
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(QUERY_INSPECTOR_SAMPLE_RATE=1, QUERY_BUDGET_STRICT=True)
+class QueryBudgetTest(TestCase):
+    """Число запросов страниц не растёт с числом постов и комментариев."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        for number in range(12):
+            post = Post.objects.create(
+                author=cls.author if number % 2 else cls.reader,
+                text=f'Пост {number}', group=cls.group)
+            for _ in range(3):
+                Comment.objects.create(post=post, author=cls.reader,
+                                       text='Ок')
+        cls.post = post
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def test_views_within_budget(self):
+        urls = {
+            'posts:index': reverse('posts:index'),
+            'posts:group_posts': reverse('posts:group_posts',
+                                         args=[self.group.slug]),
+            'posts:profile': reverse('posts:profile',
+                                     args=[self.author.username]),
+            'posts:post_detail': reverse('posts:post_detail',
+                                         args=[self.post.pk]),
+            'posts:post_comments': reverse('posts:post_comments',
+                                           args=[self.post.pk]),
+            'posts:follow_index': reverse('posts:follow_index'),
+            'posts:search': reverse('posts:search') + '?q=пост',
+            'posts:post_create': reverse('posts:post_create'),
+            'posts:post_edit': reverse('posts:post_edit',
+                                       args=[self.post.pk]),
+        }
+        self.assertEqual(set(urls), set(settings.QUERY_BUDGETS))
+        self.client.force_login(self.author)
+        for name, url in urls.items():
+            with self.subTest(view=name):
+                cache.clear()
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_writes_within_budget(self):
+        self.client.force_login(self.author)
+        response = self.client.post(reverse('posts:post_create'),
+                                    {'text': 'Новый'})
+        self.assertEqual(response.status_code, 302)
+        response = self.client.post(
+            reverse('posts:post_edit', args=[self.post.pk]),
+            {'text': 'Правка'})
+        self.assertEqual(response.status_code, 302)
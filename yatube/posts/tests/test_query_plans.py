@@ -0,0 +1,88 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+INDEXED_TABLES = ('posts_post', 'posts_comment', 'posts_follow',
+                  'posts_timeline')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN есть в SQLite')
+class QueryPlanTest(TestCase):
+    """Запросы страниц идут по индексам, без сортировки во временном B-дереве.
+
+    Страница поиска не проверяется: ранг совпадения считается во время
+    запроса, и сортировка по нему индексом не покрывается.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(author=cls.author, text='Пост',
+                                       group=cls.group)
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Ок')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client.force_login(self.author)
+        cache.clear()
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_views_use_indexes(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.reader.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+            reverse('posts:post_comments', args=[self.post.pk]),
+            reverse('posts:follow_index'),
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', args=[self.post.pk]),
+        )
+        self.client.force_login(self.reader)
+        for url in urls:
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            for query in queries.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                for step in self.plan(query['sql']):
+                    with self.subTest(url=url, sql=query['sql'], step=step):
+                        self.assertNotIn('TEMP B-TREE', step)
+                        if step.startswith('SCAN') and 'USING' not in step:
+                            self.assertNotIn(step.split()[1], INDEXED_TABLES)
+
+    def test_cursor_pages_use_indexes(self):
+        """Следующие страницы лент тоже обходятся без сортировки."""
+        for number in range(12):
+            Post.objects.create(author=self.author, text=f'Пост {number}',
+                                group=self.group)
+        self.client.force_login(self.reader)
+        for url in (reverse('posts:group_posts', args=[self.group.slug]),
+                    reverse('posts:profile', args=[self.author.username]),
+                    reverse('posts:follow_index')):
+            cursor = self.client.get(url).context['page_obj'].next_cursor
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url, {'cursor': cursor})
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                for step in self.plan(sql):
+                    with self.subTest(url=url, sql=sql, step=step):
+                        self.assertNotIn('TEMP B-TREE', step)
@@ -0,0 +1,130 @@
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..models import Comment, Post, SearchToken
+
+User = get_user_model()
+
+
+class StemTest(TestCase):
+    def test_word_forms_share_stem(self):
+        for forms in (('кошка', 'кошки', 'кошкой', 'кошкам'),
+                      ('бегать', 'бегает', 'бегали'),
+                      ('красивый', 'красивая', 'красивыми')):
+            with self.subTest(forms=forms):
+                self.assertEqual(len({search.stem(form) for form in forms}),
+                                 1)
+
+    def test_tokenize_normalizes_text(self):
+        self.assertEqual(search.tokenize('Ёжики и ЕЖИКИ, hello_world 2022'),
+                         ['ежик', 'ежик', 'hello', 'world', '2022'])
+
+
+class SearchMixin:
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.cats = Post.objects.create(
+            author=self.author, text='Наши кошки любят спать на солнце')
+        self.dogs = Post.objects.create(
+            author=self.author, text='Собака охраняет дом')
+        Comment.objects.create(post=self.dogs, author=self.author,
+                               text='А моя кошка боится собак')
+
+    def test_finds_word_forms_in_posts_and_comments(self):
+        self.assertEqual(search.search_ids('кошкам'),
+                         [self.cats.pk, self.dogs.pk])
+        self.assertEqual(search.search_ids('собаки дом'), [self.dogs.pk])
+        self.assertEqual(search.search_ids('кошки дом'), [self.dogs.pk])
+        self.assertEqual(search.search_ids('и, на'), [])
+
+    def test_index_follows_changes(self):
+        self.cats.text = 'Теперь про попугаев'
+        self.cats.save()
+        self.assertEqual(search.search_ids('кошка'), [self.dogs.pk])
+        self.assertEqual(search.search_ids('попугай'), [self.cats.pk])
+        self.dogs.comments.all().delete()
+        self.assertEqual(search.search_ids('кошка'), [])
+        self.dogs.delete()
+        self.assertEqual(search.search_ids('собака'), [])
+
+    def index_state(self):
+        if search.get_backend() == 'fts5':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT rowid, text, comments FROM {search.FTS_TABLE}')
+                return sorted((pk, text, sorted(comments.split()))
+                              for pk, text, comments in cursor.fetchall())
+        return sorted(
+            SearchToken.objects.values_list('post_id', 'term', 'weight'))
+
+    def test_comments_indexed_incrementally(self):
+        """Правки комментариев дают тот же индекс, что и пересборка."""
+        comment = Comment.objects.create(
+            post=self.cats, author=self.author, text='Кошки и собаки')
+        Comment.objects.create(post=self.cats, author=self.author,
+                               text='Кошка спит на солнце')
+        comment.text = 'Попугай и кошка'
+        comment.save()
+        self.dogs.comments.get().delete()
+        state = self.index_state()
+        search.rebuild()
+        self.assertEqual(self.index_state(), state)
+
+    def test_comment_does_not_reread_thread(self):
+        for number in range(3):
+            Comment.objects.create(post=self.cats, author=self.author,
+                                   text=f'Кошка {number}')
+        with mock.patch.object(search, 'tokenize',
+                               wraps=search.tokenize) as tokenize:
+            Comment.objects.create(post=self.cats, author=self.author,
+                                   text='Ещё кошка')
+            self.cats.delete()
+        # Прежний и новый текст одного комментария на каждое изменение.
+        self.assertEqual(tokenize.call_count, 2 * 5)
+        self.assertEqual([row[0] for row in self.index_state()],
+                         [self.dogs.pk] * len(self.index_state()))
+
+    def test_rebuild_command(self):
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(search.search_ids('кошки'),
+                         [self.cats.pk, self.dogs.pk])
+
+    def test_search_page_paginates_by_cursor(self):
+        for number in range(12):
+            Post.objects.create(author=self.author, text=f'Кошка {number}')
+        response = self.client.get(reverse('posts:search'), {'q': 'кошка'})
+        page = response.context['page_obj']
+        self.assertEqual(len(page), 10)
+        self.assertContains(response, '?q=%D0%BA%D0%BE%D1%88%D0%BA%D0%B0&')
+        response = self.client.get(reverse('posts:search'),
+                                   {'q': 'кошка', 'cursor': page.next_cursor})
+        self.assertEqual(len(response.context['page_obj']), 4)
+        self.assertIsNone(response.context['page_obj'].next_cursor)
+
+    def test_admin_uses_index(self):
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='secret')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собаки'})
+        self.assertEqual(
+            [post.pk for post in response.context['cl'].result_list],
+            [self.dogs.pk])
+
+
+@skipUnless(search.fts5_supported(), 'SQLite собран без FTS5')
+@override_settings(SEARCH_BACKEND='fts5')
+class FTS5SearchTest(SearchMixin, TestCase):
+    pass
+
+
+@override_settings(SEARCH_BACKEND='python')
+class PythonSearchTest(SearchMixin, TestCase):
+    pass
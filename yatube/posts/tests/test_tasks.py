@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase, override_settings
+
+from core import jobs
+from core.models import Job
+
+from .. import search
+from ..models import Follow, Post, Timeline, UserCounter
+
+User = get_user_model()
+
+
+@override_settings(JOBS_EAGER=False)
+class DeferredSideEffectsTest(TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+
+    def test_post_side_effects_wait_for_workers(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        jobs.work()
+        post = Post.objects.create(author=self.author, text='Отложенный')
+        self.assertEqual(
+            UserCounter.objects.get(user=self.author).posts_count, 1)
+        self.assertFalse(Timeline.objects.filter(post=post).exists())
+        self.assertEqual(search.search_ids('отложенный'), [])
+        self.assertEqual(jobs.work(), 2)
+        self.assertTrue(Timeline.objects.filter(post=post).exists())
+        self.assertEqual(search.search_ids('отложенный'), [post.pk])
+
+    def test_quick_unfollow_leaves_timeline_empty(self):
+        Post.objects.create(author=self.author, text='Пост')
+        Follow.objects.create(user=self.reader, author=self.author).delete()
+        jobs.work()
+        self.assertFalse(Job.objects.exists())
+        self.assertFalse(Timeline.objects.filter(user=self.reader).exists())
@@ -0,0 +1,100 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import thumbnails
+from ..models import Post, PostImageVariant
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+# Миниатюры строятся в тестах вручную, а не сразу при сохранении.
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, JOBS_EAGER=False)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    def test_placeholder_until_thumbnail_ready(self):
+        """Пока миниатюры нет, страница показывает заглушку."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.assertContains(self.client.get(url), 'img/placeholder.svg')
+        thumbnails.generate(self.post.pk)
+        self.post.refresh_from_db()
+        response = self.client.get(url)
+        self.assertContains(response, self.post.thumbnail.url)
+        self.assertNotContains(response, 'img/placeholder.svg')
+
+    def test_thumbnail_is_cropped(self):
+        """Миниатюра обрезается до размера ленты."""
+        thumbnails.generate(self.post.pk)
+        self.post.refresh_from_db()
+        with Image.open(self.post.thumbnail.path) as image:
+            self.assertEqual(image.size, thumbnails.SIZE)
+            self.assertEqual(image.format, 'JPEG')
+
+    def test_new_image_resets_thumbnail(self):
+        """Новая картинка сбрасывает старую миниатюру."""
+        thumbnails.generate(self.post.pk)
+        self.post.refresh_from_db()
+        self.post.image = SimpleUploadedFile('other.gif', SMALL_GIF,
+                                             'image/gif')
+        self.post.save()
+        self.post.refresh_from_db()
+        self.assertFalse(self.post.thumbnail)
+
+    def test_variants_for_every_width_and_format(self):
+        """Варианты строятся для всех ширин и доступных форматов."""
+        thumbnails.generate(self.post.pk)
+        variants = PostImageVariant.objects.filter(post=self.post)
+        self.assertEqual(
+            variants.count(),
+            len(thumbnails.VARIANT_WIDTHS) * len(
+                thumbnails.available_formats())
+        )
+        for variant in variants:
+            with self.subTest(width=variant.width, format=variant.format):
+                with Image.open(variant.image.path) as image:
+                    self.assertEqual(image.size,
+                                     (variant.width, variant.height))
+
+    def test_picture_markup(self):
+        """Страница поста отдаёт <picture> со srcset всех ширин."""
+        thumbnails.generate(self.post.pk)
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        response = self.client.get(url)
+        self.assertContains(response, '<picture>')
+        for width in thumbnails.VARIANT_WIDTHS:
+            self.assertContains(response, f' {width}w')
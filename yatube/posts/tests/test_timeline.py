@@ -0,0 +1,104 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from .. import timeline
+from ..models import Follow, Post, Timeline
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def feed(self, cursor=None, per_page=10):
+        return timeline.TimelinePaginator(
+            self.reader, per_page).cursor_page(cursor)
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков автора."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(list(self.feed()), [post])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка дополняет ленту, отписка очищает её."""
+        posts = [Post.objects.create(author=self.author, text=f'Пост {i}')
+                 for i in range(3)]
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertCountEqual(self.feed(), posts)
+        follow.delete()
+        self.assertFalse(Timeline.objects.filter(user=self.reader).exists())
+
+    @mock.patch.object(timeline, 'CELEBRITY_FOLLOWERS', 0)
+    def test_celebrity_posts_merged_on_read(self):
+        """Посты популярного автора подмешиваются при чтении без записи."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост звезды')
+        self.assertFalse(Timeline.objects.filter(post=post).exists())
+        with self.assertNumQueries(3):
+            self.assertEqual(list(self.feed()), [post])
+        self.assertFalse(Timeline.objects.filter(post=post).exists())
+
+    def test_pulled_posts_kept_below_threshold(self):
+        """Неразложенные посты остаются в ленте, когда автор теряет
+        популярность, и не копируются в ленту при подписке."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        with mock.patch.object(timeline, 'CELEBRITY_FOLLOWERS', 0):
+            star_post = Post.objects.create(author=self.author,
+                                            text='Пост звезды')
+        post = Post.objects.create(author=self.author, text='Обычный пост')
+        self.assertEqual(list(self.feed()), [post, star_post])
+        self.assertFalse(Timeline.objects.filter(post=star_post).exists())
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=other, author=self.author)
+        self.assertQuerysetEqual(
+            Timeline.objects.filter(user=other).values_list(
+                'post_id', flat=True),
+            [post.pk], transform=int)
+
+    def test_rebuild_marks_pulled_posts(self):
+        """Пересборка лент заново размечает посты популярных авторов."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        with mock.patch.object(timeline, 'CELEBRITY_FOLLOWERS', 0):
+            timeline.rebuild()
+        post.refresh_from_db()
+        self.assertFalse(post.fanned_out)
+        self.assertFalse(Timeline.objects.exists())
+        self.assertEqual(list(self.feed()), [post])
+        timeline.rebuild()
+        post.refresh_from_db()
+        self.assertTrue(post.fanned_out)
+        self.assertTrue(Timeline.objects.filter(post=post).exists())
+
+    def test_merged_pages(self):
+        """Курсор и номера страниц листают обе части ленты без повторов."""
+        star = User.objects.create_user(username='star')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=star)
+        posts = [Post.objects.create(author=(star, self.author)[i % 2],
+                                     text=f'Пост {i}') for i in range(7)]
+        expected = posts[::-1]
+        # Посты звезды подмешиваются при чтении; первый из них успел
+        # попасть и в ``Timeline`` и приходит из обеих частей ленты.
+        Post.objects.filter(author=star).update(fanned_out=False)
+        Timeline.objects.filter(author=star).exclude(post=posts[0]).delete()
+        pulled = []
+        cursor = None
+        while True:
+            page = self.feed(cursor, per_page=3)
+            pulled.extend(page)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(pulled, expected)
+        previous = self.feed(page.previous_cursor, per_page=3)
+        self.assertEqual(list(previous), expected[3:6])
+        paginator = timeline.TimelinePaginator(self.reader, 3)
+        self.assertEqual(paginator.count, 7)
+        self.assertEqual(list(paginator.page(2)), expected[3:6])
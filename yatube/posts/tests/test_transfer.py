@@ -0,0 +1,126 @@
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import DateTimeField
+from django.test import TestCase
+
+from .. import search, transfer
+from ..models import Comment, Follow, Group, Post, Timeline, UserCounter
+
+User = get_user_model()
+
+KINDS = ('users', 'groups', 'posts', 'comments', 'follows')
+
+
+class TransferTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.post = Post.objects.create(author=self.author, text='Кошки',
+                                        group=self.group)
+        Post.objects.create(author=self.author, text='Без группы')
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Ага, "кошки"; вот\nтак')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def export(self, file_format):
+        paths = {}
+        for kind in KINDS:
+            paths[kind] = f'{self.directory}/{kind}.{file_format}'
+            call_command('posts_export', kind, format=file_format,
+                         output=paths[kind], stdout=StringIO())
+        return paths
+
+    def wipe(self):
+        for model in (Follow, Comment, Post, Group, User):
+            model.objects.all().delete()
+
+    def load(self, paths):
+        for kind in KINDS:
+            call_command('posts_import', kind, paths[kind],
+                         no_rebuild=kind != KINDS[-1], batch_size=1,
+                         stdout=StringIO())
+
+    def assertRestored(self):
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.pub_date, self.post.pub_date)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Post.objects.filter(group=None).count(), 1)
+        self.assertEqual(Comment.objects.get().text,
+                         'Ага, "кошки"; вот\nтак')
+        self.assertEqual(UserCounter.objects.get(user=self.author)
+                         .followers_count, 1)
+        self.assertEqual(Timeline.objects.filter(user=self.reader).count(),
+                         2)
+        self.assertEqual(search.search_ids('кошка'), [self.post.pk])
+        self.assertFalse(User.objects.get(pk=self.reader.pk)
+                         .has_usable_password())
+
+    def test_ndjson_round_trip(self):
+        paths = self.export('ndjson')
+        self.wipe()
+        self.load(paths)
+        self.assertRestored()
+
+    def test_csv_round_trip(self):
+        paths = self.export('csv')
+        self.wipe()
+        self.load(paths)
+        self.assertRestored()
+
+    def test_export_to_stdout(self):
+        for file_format in ('ndjson', 'csv'):
+            with self.subTest(file_format=file_format):
+                out = StringIO()
+                call_command('posts_export', 'posts', format=file_format,
+                             stdout=out, stderr=StringIO())
+                lines = out.getvalue().splitlines()
+                self.assertNotIn('', lines)
+                rows = list(transfer.read_rows(StringIO(out.getvalue()),
+                                               file_format))
+                self.assertEqual([int(row['id']) for row in rows],
+                                 list(Post.objects.order_by('pk')
+                                      .values_list('pk', flat=True)))
+
+    def test_new_rows_get_ids_and_dates(self):
+        path = f'{self.directory}/posts.ndjson'
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.write(f'{{"text": "Новый", "author_id": {self.author.pk}}}'
+                         '\n')
+        out = StringIO()
+        call_command('posts_import', 'posts', path, stdout=out)
+        self.assertIn('строк/с', out.getvalue())
+        post = Post.objects.get(text='Новый')
+        self.assertIsNotNone(post.pub_date)
+        self.assertEqual(Post.objects.create(author=self.author,
+                                             text='Ещё').pk, post.pk + 1)
+
+    def test_dates_kept_without_changing_fields(self):
+        """Даты из файла сохраняются, а auto_now_add у поля не выключается."""
+        pre_save = DateTimeField.pre_save
+        auto_now_add = []
+
+        def record(field, instance, add):
+            if field.name == 'pub_date':
+                auto_now_add.append(field.auto_now_add)
+            return pre_save(field, instance, add)
+
+        date = datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        with mock.patch.object(DateTimeField, 'pre_save', record):
+            transfer.import_rows('posts', [
+                {'id': 100, 'text': 'Старый', 'author_id': self.author.pk,
+                 'pub_date': date.isoformat()},
+                {'id': 101, 'text': 'Без даты', 'author_id': self.author.pk},
+            ])
+        self.assertEqual(auto_now_add, [True, True])
+        self.assertEqual(Post.objects.get(pk=100).pub_date, date)
+        self.assertGreater(Post.objects.get(pk=101).pub_date, date)
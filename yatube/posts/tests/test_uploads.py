@@ -0,0 +1,123 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post
+from ..uploadhandlers import BoundedImageUploadHandler
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(size, image_format='JPEG', exif=None):
+    buffer = BytesIO()
+    options = {'exif': exif} if exif is not None else {}
+    Image.new('RGB', size, 'red').save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def create(self, content, name='photo.jpg'):
+        return self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile(name, content, 'image/jpeg'),
+        })
+
+    @override_settings(POST_IMAGE_MAX_SIZE=1024)
+    def test_oversized_file_rejected(self):
+        response = self.create(make_image((600, 600)) + b'\0' * 2048)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('image', response.context['form'].errors)
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100 * 100)
+    def test_too_many_pixels_rejected_by_header(self):
+        response = self.create(make_image((200, 200)))
+        self.assertIn('image', response.context['form'].errors)
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_SIDE=100)
+    def test_image_reencoded_once_without_exif(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        self.create(make_image((400, 200), exif=exif))
+        post = Post.objects.get()
+        with post.image.open('rb') as source, Image.open(source) as image:
+            self.assertEqual(image.size, (100, 50))
+            self.assertEqual(image.format, 'JPEG')
+            self.assertNotIn(0x010F, image.getexif())
+
+    def test_unknown_format_saved_as_png(self):
+        self.create(make_image((20, 20), 'BMP'), name='photo.bmp')
+        post = Post.objects.get()
+        self.assertTrue(post.image.name.endswith('.png'))
+
+    def test_truncated_image_rejected(self):
+        content = make_image((600, 600))
+        response = self.create(content[:len(content) // 2])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('image', response.context['form'].errors)
+        self.assertFalse(Post.objects.exists())
+
+    def test_cmyk_image_saved_as_rgb_png(self):
+        buffer = BytesIO()
+        Image.new('CMYK', (20, 20)).save(buffer, 'TIFF')
+        self.create(buffer.getvalue(), name='photo.tiff')
+        post = Post.objects.get()
+        with post.image.open('rb') as source, Image.open(source) as image:
+            self.assertEqual(image.format, 'PNG')
+            self.assertEqual(image.mode, 'RGB')
+
+    @override_settings(POST_IMAGE_MAX_SIZE=1024)
+    def test_limits_checked_before_csrf(self):
+        """Обработчики загрузки сменяются до того, как CSRF прочтёт тело."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        client.get(reverse('posts:post_create'))
+        response = client.post(reverse('posts:post_create'), {
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile(
+                'photo.jpg', make_image((600, 600)) + b'\0' * 2048,
+                'image/jpeg'),
+            'csrfmiddlewaretoken': client.cookies['csrftoken'].value,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('image', response.context['form'].errors)
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100 * 100)
+    def test_api_upload_limited(self):
+        response = self.client.post(reverse('api:posts'), {
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile('photo.jpg', make_image((200, 200)),
+                                        'image/jpeg'),
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.json()['errors'])
+
+    def test_other_uploads_unlimited(self):
+        request = RequestFactory().post('/')
+        self.assertFalse(any(
+            isinstance(handler, BoundedImageUploadHandler)
+            for handler in request.upload_handlers))
@@ -1,6 +1,6 @@
 from http import HTTPStatus
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from ..models import Group, Post
@@ -8,6 +8,7 @@ from ..models import Group, Post
 User = get_user_model()
 
 
+@override_settings(PAGE_CACHE_SECONDS=0)
 class PostURLTests(TestCase):
     @classmethod
     def setUpClass(cls):
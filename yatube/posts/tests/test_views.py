@@ -6,19 +6,21 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from posts.views import NUM_POST
+from posts.views import NUM_COMMENTS, NUM_POST
 
-from ..models import Follow, Group, Post
+from ..models import Comment, Follow, Group, Post
 
 User = get_user_model()
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, PAGE_CACHE_SECONDS=0)
 class PostPagesTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -113,20 +115,33 @@ class PostPagesTests(TestCase):
             self.assertEqual(posts_image_1, PostPagesTests.post.image)
 
     def test_cache_index_page_correct_context(self):
-        """Кэш index сформирован с правильным контекстом."""
+        """Кэш index сбрасывается при изменении постов."""
         response = self.authorized_client.get(reverse('posts:index'))
         content = response.content
+        new_response = self.authorized_client.get(reverse('posts:index'))
+        self.assertEqual(content, new_response.content)
         post_id = PostPagesTests.post.id
         instance = Post.objects.get(pk=post_id)
         instance.delete()
-        new_response = self.authorized_client.get(reverse('posts:index'))
-        new_content = new_response.content
-        self.assertEqual(content, new_content)
-        cache.clear()
         new_new_response = self.authorized_client.get(reverse('posts:index'))
         new_new_content = new_new_response.content
         self.assertNotEqual(content, new_new_content)
 
+    def test_cached_pages_vary_by_page_and_user(self):
+        """Кэш ленты различает страницы, гостей и читателей."""
+        url = reverse('posts:index')
+        guest_content = self.guest_client.get(url).content
+        user_content = self.authorized_client.get(url).content
+        self.assertNotEqual(guest_content, user_content)
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост #{i}')
+            for i in range(NUM_POST)
+        )
+        cache.clear()
+        first_page = self.guest_client.get(url).content
+        second_page = self.guest_client.get(url, {'page': 2}).content
+        self.assertNotEqual(first_page, second_page)
+
     def test_group_posts_page_show_correct_context(self):
         """Шаблон group_posts сформирован с правильным контекстом."""
         for post in Post.objects.all():
@@ -291,6 +306,49 @@ class PaginatorViewsTest(TestCase):
         self.get_second_page_contains_three_records(self.authorized_client,
                                                     pages_names)
 
+    def test_cursor_pages(self):
+        """Курсор ведёт на следующую и обратно на предыдущую страницу."""
+        pages_names = [
+            reverse('posts:index'),
+            reverse('posts:group_posts',
+                    kwargs={'slug': PaginatorViewsTest.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': PaginatorViewsTest.user.username}),
+        ]
+        for url in pages_names:
+            with self.subTest(url=url):
+                first_page = self.authorized_client.get(url).context[
+                    'page_obj']
+                self.assertIsNone(first_page.previous_cursor)
+                with CaptureQueriesContext(connection) as queries:
+                    second_page = self.authorized_client.get(
+                        url, {'cursor': first_page.next_cursor}
+                    ).context['page_obj']
+                self.assertFalse(any('OFFSET' in query['sql']
+                                     for query in queries))
+                self.assertEqual(len(second_page),
+                                 self.NUM_POST_OF_PAGE_TWO)
+                self.assertIsNone(second_page.next_cursor)
+                back_page = self.authorized_client.get(
+                    url, {'cursor': second_page.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back_page), list(first_page))
+
+    def test_cursor_page_without_count(self):
+        """Переход по курсору не считает посты через COUNT(*)."""
+        url = reverse('posts:index')
+        first_page = self.authorized_client.get(url).context['page_obj']
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url,
+                                       {'cursor': first_page.next_cursor})
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
+
+    def test_broken_cursor_shows_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        response = self.authorized_client.get(reverse('posts:index'),
+                                              {'cursor': '!!!'})
+        self.assertEqual(len(response.context['page_obj']), NUM_POST)
+
 
 class FollowTest(TestCase):
     @classmethod
@@ -337,3 +395,111 @@ class FollowTest(TestCase):
         }))
         response = self.simple_user_client.get(reverse('posts:follow_index'))
         self.assertNotIn(self.post.text, response)
+
+
+class FeedQueriesTest(TestCase):
+    """Число запросов ленты не зависит от количества постов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост #{i}', group=cls.group)
+            for i in range(NUM_POST)
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(FeedQueriesTest.reader)
+        cache.clear()
+
+    def test_feed_query_budget(self):
+        """Ленты укладываются в бюджет запросов."""
+        post = Post.objects.first()
+        budgets = (
+            (self.guest_client, reverse('posts:index'), 2),
+            (self.guest_client,
+             reverse('posts:group_posts',
+                     kwargs={'slug': FeedQueriesTest.group.slug}), 3),
+            (self.guest_client,
+             reverse('posts:profile',
+                     kwargs={'username': FeedQueriesTest.user.username}), 4),
+            (self.guest_client,
+             reverse('posts:post_detail', kwargs={'post_id': post.id}), 3),
+            (self.reader_client, reverse('posts:follow_index'), 5),
+        )
+        for client, url, budget in budgets:
+            with self.subTest(url=url):
+                with self.assertNumQueries(budget):
+                    client.get(url)
+
+
+@override_settings(PAGE_CACHE_SECONDS=0)
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        cls.extra = 3
+        for number in range(NUM_COMMENTS + cls.extra):
+            reader = User.objects.create_user(username=f'reader{number}')
+            Comment.objects.create(post=cls.post, author=reader,
+                                   text=f'Комментарий {number}')
+
+    def test_first_page_in_created_order(self):
+        """На странице поста первые комментарии от старых к новым."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in comments],
+            [f'Комментарий {number}' for number in range(NUM_COMMENTS)])
+        self.assertContains(response, 'data-comments-more')
+
+    def test_comment_authors_joined(self):
+        """Авторы комментариев не запрашиваются по одному."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:post_detail', args=[self.post.pk]))
+        self.assertFalse(any('WHERE "auth_user"."id" = ' in query['sql']
+                             for query in queries))
+
+    def test_fragment_continues_after_cursor(self):
+        """Фрагмент по курсору отдаёт следующие комментарии без страницы."""
+        first = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        ).context['comments']
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.post.pk]),
+            {'cursor': first.next_cursor})
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            [f'Комментарий {NUM_COMMENTS + number}'
+             for number in range(self.extra)])
+        self.assertNotContains(response, 'data-comments-more')
+
+    def test_fragment_for_missing_post(self):
+        """Фрагмент комментариев несуществующего поста — 404."""
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.post.pk + 100]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_detail_page_follows_cursor_without_script(self):
+        """Без скрипта ссылка «Показать ещё» открывает пост со второй
+        страницей комментариев."""
+        first = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        ).context['comments']
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk]),
+            {'cursor': first.next_cursor})
+        self.assertEqual(len(response.context['comments']), self.extra)
@@ -0,0 +1,132 @@
+"""Фоновая подготовка миниатюр и адаптивных вариантов картинок постов.
+
+Миниатюра и варианты разной ширины и формата строятся воркерами
+очереди core.jobs после фиксации транзакции, а шаблоны показывают
+заглушку, пока миниатюра не готова: запрос сам картинку не ресайзит.
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+from core.jobs import task
+
+from . import invalidation
+from .models import Post, PostImageVariant
+
+SIZE = (960, 339)
+QUALITY = 85
+VARIANT_WIDTHS = (320, 640, 960)
+# Формат варианта: (формат Pillow, расширение, доступен ли в сборке Pillow).
+VARIANT_FORMATS = {
+    'avif': ('AVIF', 'avif', 'AVIF' in Image.SAVE),
+    'webp': ('WEBP', 'webp', features.check('webp')),
+    'jpeg': ('JPEG', 'jpg', True),
+}
+
+
+def thumbnail_name(post):
+    """Имя миниатюры однозначно определяется постом и его картинкой."""
+    stem = os.path.splitext(os.path.basename(post.image.name))[0]
+    width, height = SIZE
+    return f'posts/thumbs/{post.pk}_{stem}_{width}x{height}.jpg'
+
+
+def available_formats():
+    return [name for name, (_, _, available) in VARIANT_FORMATS.items()
+            if available]
+
+
+def _crop(source, size):
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        return ImageOps.fit(image, size, Image.LANCZOS)
+
+
+def _encode(image, image_format):
+    buffer = BytesIO()
+    options = {'quality': QUALITY}
+    if image_format == 'JPEG':
+        options.update(optimize=True, progressive=True)
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def build_variants(post, largest):
+    """Пересоздаёт варианты картинки всех ширин и доступных форматов.
+
+    ``largest`` — картинка, уже обрезанная до SIZE.
+    """
+    delete_variants(post.pk)
+    stem = os.path.splitext(os.path.basename(post.image.name))[0]
+    variants = []
+    for width in VARIANT_WIDTHS:
+        height = round(width * SIZE[1] / SIZE[0])
+        image = largest.resize((width, height), Image.LANCZOS)
+        for name in available_formats():
+            image_format, extension, _ = VARIANT_FORMATS[name]
+            file_name = default_storage.save(
+                f'posts/variants/{post.pk}_{stem}_{width}.{extension}',
+                ContentFile(_encode(image, image_format)),
+            )
+            variants.append(PostImageVariant(
+                post_id=post.pk, width=width, height=height, format=name,
+                image=file_name,
+            ))
+    PostImageVariant.objects.bulk_create(variants)
+
+
+def delete_variants(post_id):
+    variants = PostImageVariant.objects.filter(post_id=post_id)
+    for variant in variants:
+        variant.image.delete(save=False)
+    variants.delete()
+
+
+def generate(post_id):
+    post = Post.objects.filter(pk=post_id).only(
+        'image', 'thumbnail', 'author_id', 'group_id').first()
+    if post is None or not post.image:
+        return
+    name = thumbnail_name(post)
+    if post.thumbnail.name == name:
+        return
+    with post.image.open('rb') as source:
+        largest = _crop(source, SIZE)
+    default_storage.delete(name)
+    saved = default_storage.save(name, ContentFile(_encode(largest, 'JPEG')))
+    build_variants(post, largest)
+    updated = Post.objects.filter(pk=post_id, image=post.image.name).update(
+        thumbnail=saved)
+    if updated:
+        invalidation.dispatch(invalidation.Change(
+            post.pk, {'thumbnail'}, [post.author_id], [post.group_id]))
+    else:
+        default_storage.delete(saved)
+        delete_variants(post_id)
+
+
+# Ресайз долгий и нужен только картинкам: ленты и поиск важнее.
+@task(priority=-10)
+def build(post_id):
+    generate(post_id)
+
+
+def schedule(post_id):
+    """Ставит построение миниатюры в очередь после фиксации транзакции."""
+    build.delay(post_id)
+
+
+def refresh(post):
+    """Сбрасывает устаревшую миниатюру и заказывает новую."""
+    expected = thumbnail_name(post) if post.image else ''
+    if post.thumbnail.name == expected:
+        return
+    if post.thumbnail:
+        Post.objects.filter(pk=post.pk).update(thumbnail='')
+        post.thumbnail = ''
+        delete_variants(post.pk)
+    if post.image:
+        schedule(post.pk)
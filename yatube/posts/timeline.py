@@ -0,0 +1,146 @@
+"""Лента подписок с раздачей постов при записи (fan-out-on-write).
+
+Новый пост сразу раскладывается в ленты подписчиков автора, поэтому
+чтение ленты — один проход по индексу (user, -pub_date) таблицы
+``Timeline``. Посты авторов с очень большим числом подписчиков при записи
+не раскладываются и помечаются ``fanned_out=False``: такие посты
+подмешиваются к ленте при чтении, даже если автор потом растерял
+подписчиков.
+"""
+from django.core.paginator import Page
+from django.db import connection
+from django.utils.functional import cached_property
+
+from core.paginator import CursorPaginator
+
+from .models import FEED_FIELDS, Follow, Post, Timeline, UserCounter
+
+CELEBRITY_FOLLOWERS = 1000
+BATCH_SIZE = 500
+
+
+def _entry(user_id, post):
+    return Timeline(user_id=user_id, post_id=post.pk,
+                    author_id=post.author_id, pub_date=post.pub_date)
+
+
+def fan_out(post):
+    """Раскладывает новый пост в ленты подписчиков автора."""
+    if UserCounter.objects.filter(
+        user_id=post.author_id, followers_count__gt=CELEBRITY_FOLLOWERS
+    ).exists():
+        Post.objects.filter(pk=post.pk).update(fanned_out=False)
+        return
+    followers = Follow.objects.filter(author_id=post.author_id).values_list(
+        'user_id', flat=True).iterator()
+    Timeline.objects.bulk_create(
+        (_entry(user_id, post) for user_id in followers),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту читателя разложенные посты нового автора.
+
+    Остальные посты автора лента подмешивает при чтении.
+    """
+    posts = Post.objects.filter(author_id=author_id, fanned_out=True).only(
+        'pub_date', 'author_id').order_by().iterator()
+    Timeline.objects.bulk_create(
+        (_entry(user_id, post) for post in posts),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты читателя посты автора, от которого он отписался."""
+    Timeline.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild():
+    """Собирает ленты всех читателей заново одним INSERT ... SELECT.
+
+    Посты популярных авторов заново помечаются как неразложенные: их
+    добавляет при чтении ``TimelinePaginator``. Счётчики подписчиков
+    должны быть актуальны.
+    """
+    Timeline.objects.all().delete()
+    Post.objects.filter(fanned_out=False).update(fanned_out=True)
+    Post.objects.filter(
+        author__counters__followers_count__gt=CELEBRITY_FOLLOWERS,
+    ).update(fanned_out=False)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {Timeline._meta.db_table} '
+            '(user_id, post_id, author_id, pub_date) '
+            'SELECT follow.user_id, post.id, post.author_id, post.pub_date '
+            f'FROM {Follow._meta.db_table} follow '
+            f'JOIN {Post._meta.db_table} post '
+            'ON post.author_id = follow.author_id '
+            'WHERE post.fanned_out = %s',
+            [True],
+        )
+
+
+def pulled_authors(user):
+    """Авторы из подписок, у которых есть неразложенные посты."""
+    return Follow.objects.filter(
+        user=user, author__posts__fanned_out=False,
+    ).values_list('author_id', flat=True).distinct()
+
+
+class TimelinePaginator(CursorPaginator):
+    """Лента подписок читателя по курсору (дата публикации, id поста).
+
+    Записи ``Timeline`` сливаются с неразложенными постами прямо при
+    чтении: открытие ленты ничего не пишет в базу и не закрепляет
+    читателя за основной базой. Страницы — посты без вариантов картинок.
+    """
+
+    def __init__(self, user, per_page):
+        super().__init__(Timeline.objects.filter(user=user), per_page)
+        self.pulled_ids = list(pulled_authors(user))
+
+    def pulled(self):
+        """Неразложенные посты авторов из подписок."""
+        return Post.objects.filter(author_id__in=self.pulled_ids,
+                                   fanned_out=False)
+
+    def fetch(self, position, forward, limit):
+        entries = self.object_list.select_related(
+            'post__author', 'post__group',
+        ).only('pub_date', 'post_id',
+               *(f'post__{field}' for field in FEED_FIELDS))
+        posts = {
+            entry.post_id: entry.post
+            for entry in self.after(entries, position, forward,
+                                    pk='post_id')[:limit]
+        }
+        if self.pulled_ids:
+            pulled = self.pulled().select_related(
+                'author', 'group').only(*FEED_FIELDS)
+            for post in self.after(pulled, position, forward)[:limit]:
+                posts.setdefault(post.pk, post)
+        return sorted(
+            posts.values(), key=lambda post: (post.pub_date, post.pk),
+            reverse=forward == self.descending,
+        )[:limit]
+
+    @cached_property
+    def count(self):
+        count = self.object_list.count()
+        if self.pulled_ids:
+            count += self.pulled().exclude(
+                pk__in=self.object_list.values('post_id')).count()
+        return count
+
+    def page(self, number):
+        """Нумерованная страница для старых ссылок."""
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = self.fetch(None, True, bottom + self.per_page)[bottom:]
+        page = Page(rows, number, self)
+        self.set_cursors(page, page.has_previous(), page.has_next())
+        return page
@@ -0,0 +1,88 @@
+"""Потоковая загрузка картинок постов с ранней проверкой.
+
+Файл пишется на диск частями и отбрасывается, как только превышает
+POST_IMAGE_MAX_SIZE или когда по заголовку видно, что в нём больше
+POST_IMAGE_MAX_PIXELS пикселей. Отброшенный файл не попадает в
+``request.FILES``, а причина сохраняется в ``request.upload_errors``,
+чтобы форма показала её пользователю. Ограничения действуют только в
+view постов, которые включают их через ``bound_uploads`` или
+``bounded_uploads``; остальные загрузки сайта идут обычным путём.
+"""
+import warnings
+from functools import wraps
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadhandler import (SkipFile,
+                                             TemporaryFileUploadHandler)
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image
+
+
+def pixel_error(source):
+    """Текст ошибки, если заголовок картинки обещает слишком много пикселей.
+
+    ``Image.open`` читает только заголовок, сами пиксели не декодируются.
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+            with Image.open(source) as image:
+                width, height = image.size
+    except Image.DecompressionBombError:
+        width = height = None
+    except Exception:
+        # Нераспознанный файл отклонит проверка ImageField.
+        return None
+    if width is None or width * height > settings.POST_IMAGE_MAX_PIXELS:
+        return (f'Картинка больше {settings.POST_IMAGE_MAX_PIXELS} '
+                f'пикселей.')
+    return None
+
+
+class BoundedImageUploadHandler(TemporaryFileUploadHandler):
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def reject(self, message):
+        """Отбрасывает файл: парсер закроет его и пропустит остаток."""
+        if not hasattr(self.request, 'upload_errors'):
+            self.request.upload_errors = {}
+        self.request.upload_errors[self.field_name] = message
+        raise SkipFile(message)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_SIZE:
+            limit = settings.POST_IMAGE_MAX_SIZE // (1024 * 1024)
+            self.reject(f'Файл больше {limit} МБ.')
+        if start == 0:
+            message = pixel_error(BytesIO(raw_data))
+            if message:
+                self.reject(message)
+        return super().receive_data_chunk(raw_data, start)
+
+
+def bound_uploads(request):
+    """Принимает файлы запроса через BoundedImageUploadHandler.
+
+    Вызывается до первого обращения к ``request.POST`` и ``request.FILES``.
+    """
+    request.upload_handlers = [BoundedImageUploadHandler(request)]
+
+
+def bounded_uploads(view):
+    """Декоратор view, принимающего картинки постов.
+
+    Проверка CSRF читает тело запроса, после чего обработчики загрузки уже
+    не сменить, поэтому она выполняется внутри, после ``bound_uploads``.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        bound_uploads(request)
+        return protected(request, *args, **kwargs)
+    return wrapper
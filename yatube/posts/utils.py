@@ -0,0 +1,37 @@
+from django.core.paginator import Page
+
+from core.cache import get_or_build
+from core.paginator import CursorPaginator
+
+PAGE_TIMEOUT = 60 * 60
+
+
+def paginate(request, paginator):
+    """Страница по курсору, а для старых ссылок — по номеру."""
+    page_number = request.GET.get('page')
+    if page_number is not None and 'cursor' not in request.GET:
+        return paginator.get_page(page_number)
+    return paginator.cursor_page(request.GET.get('cursor'))
+
+
+def get_page(request, queryset, per_page, cache_key=None):
+    """Страница ленты: по курсору, а для старых ссылок — по номеру.
+
+    С ``cache_key`` строки страницы берутся из кэша, а запрос в базу
+    выполняет только один из одновременно пришедших запросов.
+    """
+    paginator = CursorPaginator(queryset, per_page)
+    if cache_key is None:
+        return paginate(request, paginator)
+
+    def build():
+        page = paginate(request, paginator)
+        return (page.object_list, page.number,
+                page.previous_cursor is not None,
+                page.next_cursor is not None)
+
+    rows, number, has_previous, has_next = get_or_build(
+        f'{cache_key}:rows', build, PAGE_TIMEOUT)
+    page = Page(rows, number, paginator)
+    paginator.set_cursors(page, has_previous, has_next)
+    return page
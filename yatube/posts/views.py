@@ -1,78 +1,156 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_http_methods
 
+from core.db.routers import read_replica
+from core.paginator import CursorPaginator, RankedPaginator
+
+from . import caching, counters, follows, search, timeline
+from .conditional import condition, viewer_follows
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
+from .models import Comment, Group, Post
+from .uploadhandlers import bounded_uploads
+from .utils import get_page, paginate
 
 NUM_POST = 10
+NUM_COMMENTS = 20
 
 User = get_user_model()
 
 
+def _index_scopes(request):
+    return [caching.ALL_POSTS], {}
+
+
+def _group_scopes(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return [caching.group_scope(group.pk)], {'group': group}
+
+
+def _post_scopes(request, post_id):
+    """Пост с комментариями и счётчик постов его автора."""
+    post = get_object_or_404(Post.objects.detail(), id=post_id)
+    scopes = [caching.post_scope(post.pk),
+              caching.author_scope(post.author_id)]
+    return scopes, {'post': post}
+
+
+def _profile_scopes(request, username):
+    """Посты и счётчики автора.
+
+    Кнопка подписки читателя меняется вместе с подписчиками автора.
+    """
+    author = get_object_or_404(User, username=username)
+    scopes = [caching.author_scope(author.pk),
+              caching.follow_scope(author.pk),
+              caching.followers_scope(author.pk)]
+    return scopes, {'author': author}
+
+
+@read_replica
+@condition(_index_scopes, viewer_follows)
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, NUM_POST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.feed()
+    cache_key = caching.feed_key(request, caching.ALL_POSTS)
+    page_obj = get_page(request, post_list, NUM_POST, cache_key)
+    caching.attach_versions(page_obj)
     context = {
         'page_obj': page_obj,
+        'cache_key': cache_key,
     }
     return render(request, 'posts/index.html', context)
 
 
-def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, NUM_POST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+@read_replica
+@condition(_group_scopes, viewer_follows)
+def group_posts(request, slug, group):
+    posts = group.posts.feed()
+    cache_key = caching.feed_key(request, caching.group_scope(group.pk))
+    page_obj = get_page(request, posts, NUM_POST, cache_key)
+    caching.attach_versions(page_obj)
     context = {
         'group': group,
         'page_obj': page_obj,
+        'cache_key': cache_key,
     }
     return render(request, 'posts/group_list.html', context)
 
 
-def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+def search_posts(request):
+    """Посты, найденные по словам запроса, от лучшего совпадения."""
+    query = request.GET.get('q', '').strip()
+    paginator = RankedPaginator(
+        search.search_ids(query), NUM_POST, Post.objects.feed())
+    page_obj = paginator.cursor_page(request.GET.get('cursor'))
+    caching.attach_versions(page_obj)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@read_replica
+@condition(_post_scopes)
+def post_detail(request, post_id, post):
+    prefetch_related_objects([post], 'image_variants')
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
     context = {
         'post': post,
         'form': form,
-        'comments': comments,
+        'comments': get_comments(request, post.pk),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
-def profile(request, username):
+def get_comments(request, post_id):
+    """Страница комментариев поста от старых к новым по курсору."""
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).thread(), NUM_COMMENTS,
+        key='created', descending=False)
+    return paginator.cursor_page(request.GET.get('cursor'))
+
+
+@read_replica
+def post_comments(request, post_id):
+    """Следующие страницы комментариев фрагментом для подгрузки на странице."""
+    get_object_or_404(Post, pk=post_id)
+    context = {
+        'comments': get_comments(request, post_id),
+        'post_id': post_id,
+    }
+    return render(request, 'includes/comment_list.html', context)
+
+
+@read_replica
+@condition(_profile_scopes)
+def profile(request, username, author):
     """Список постов автора."""
-    author = get_object_or_404(User, username=username)
-    author_posts = author.posts.all()
-    count = author_posts.count()
-    paginator = Paginator(author_posts, NUM_POST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    following = False
-    if request.user.is_authenticated and author != request.user:
-        following = Follow.objects.filter(
-            user=request.user, author=author).exists()
+    author_posts = author.posts.feed()
+    author_counters = counters.get_counters(author)
+    cache_key = caching.feed_key(request, caching.author_scope(author.pk))
+    page_obj = get_page(request, author_posts, NUM_POST, cache_key)
+    caching.attach_versions(page_obj)
     context = {
-        'count': count,
+        'count': author_counters.posts_count,
+        'counters': author_counters,
         'author': author,
         'page_obj': page_obj,
-        'following': following}
+        'cache_key': cache_key}
     return render(request, 'posts/profile.html', context)
 
 
 @require_http_methods(["GET", "POST"])
+@bounded_uploads
+@transaction.atomic
 def post_create(request):
     form = PostForm(
         request.POST or None,
-        files=request.FILES or None
+        files=request.FILES or None,
+        upload_errors=getattr(request, 'upload_errors', None),
     )
     if form.is_valid():
         post = form.save(commit=False)
@@ -89,12 +167,15 @@ def post_create(request):
 
 @login_required
 @require_http_methods(["GET", "POST"])
+@bounded_uploads
+@transaction.atomic
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
-        instance=post
+        instance=post,
+        upload_errors=getattr(request, 'upload_errors', None),
     )
     if form.is_valid():
         post = form.save(commit=False)
@@ -107,6 +188,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -119,36 +201,35 @@ def add_comment(request, post_id):
 
 
 @login_required
+@read_replica
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, NUM_POST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(
+        request, timeline.TimelinePaginator(request.user, NUM_POST))
+    prefetch_related_objects(page_obj.object_list, 'image_variants')
+    caching.attach_versions(page_obj)
     context = {
-        'page_obj': page_obj}
+        'page_obj': page_obj,
+        'cache_key': caching.feed_key(
+            request,
+            caching.ALL_POSTS,
+            caching.follow_scope(request.user.pk)
+        )}
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     """Делает подписку на автора."""
     author = get_object_or_404(User, username=username)
-    follow = Follow.objects.filter(
-        user=request.user,
-        author=author)
-    if request.user != author and not follow.exists():
-        Follow.objects.create(user=request.user,
-                              author=author)
-
+    follows.follow(request.user.pk, author.pk)
     return redirect('posts:profile', username=username)
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     """Делает отписку от автора."""
-    author = User.objects.get(username=username)
-    Follow.objects.filter(
-        user=request.user,
-        author=author,
-    ).delete()
+    author = get_object_or_404(User, username=username)
+    follows.unfollow(request.user.pk, author.pk)
     return redirect('posts:profile', username=username)
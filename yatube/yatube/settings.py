@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import sys
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -33,6 +34,7 @@ INSTALLED_APPS = [
     'posts.apps.PostsConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -43,21 +45,30 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.middleware.QueryInspectorMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.PrimaryStickyMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.HoleMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 
+# Запуск под manage.py test или pytest: воркеров при тестах нет.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+TEST_RUNNER = 'core.test_runner.DiscoverRunner'
+
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.DjangoTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -78,13 +89,39 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# core.db.sqlite3 включает WAL и другие PRAGMA для каждого соединения,
+# значения по умолчанию переопределяются в OPTIONS['pragmas'].
+# CONN_MAX_AGE — сколько секунд соединение переживает запрос (0 —
+# закрывать после каждого запроса).
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': 'core.db.sqlite3',
+        'NAME': os.environ.get(
+            'DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
     }
 }
 
+# Реплики для чтения лент и страниц постов: пути к файлам SQLite через
+# запятую в DB_REPLICAS. Реплики наполняются извне (копией или
+# репликацией файла основной базы), миграции к ним не применяются.
+# REPLICA_STICKY_SECONDS — сколько секунд после записи пользователь
+# читает только с основной базы. REPLICA_CACHE_SECONDS — сколько секунд
+# свежи в кэше страницы и фрагменты, прочитанные с реплики.
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+        filter(None, os.environ.get('DB_REPLICAS', '').split(',')), 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': path,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+REPLICA_CACHE_SECONDS = int(os.environ.get('REPLICA_CACHE_SECONDS', 10))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -137,8 +174,108 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Картинки постов пишутся на диск частями; слишком большие файлы и
+# картинки с огромным числом пикселей отбрасываются по заголовку, а
+# принятые один раз пережимаются до POST_IMAGE_MAX_SIDE без EXIF.
+# Ограничения включают только view постов (posts.uploadhandlers).
+POST_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+POST_IMAGE_MAX_SIDE = 2560
+
+# Очередь фоновых задач core.jobs: ленты подписок, поисковый индекс,
+# миниатюры. Задачи ставятся в очередь и выполняются воркерами
+# manage.py run_workers. JOBS_EAGER=1 выполняет их сразу в запросе —
+# для разработки без воркеров; в тестах этот режим включён всегда.
+# Неудачная попытка повторяется через JOBS_RETRY_DELAY секунд, и каждый
+# следующий раз задержка удваивается.
+JOBS_EAGER = TESTING or os.environ.get('JOBS_EAGER') == '1'
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_DELAY = 10
+JOBS_POLL_SECONDS = 1.0
+# Задача, которую воркер держит дольше, считается брошенной.
+JOBS_LOCK_TIMEOUT = 10 * 60
+
+# Поколения кэша и переиндексация меняются после фиксации транзакции
+# (posts.caching.after_commit). Тесты не фиксируют свои транзакции,
+# поэтому в них это делается сразу.
+ON_COMMIT_EAGER = TESTING
+
+# Кэш выбирается переменной окружения CACHE_BACKEND: locmem — свой у
+# каждого процесса, file и sqlite — общие для всех процессов узла.
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'core.cache_backends.LocMemCache',
+        'LOCATION': 'yatube',
+    },
+    'file': {
+        'BACKEND': 'core.cache_backends.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'files'),
+    },
+    'sqlite': {
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'cache.sqlite3'),
+    },
+}
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        **CACHE_BACKENDS[CACHE_BACKEND],
+        'KEY_PREFIX': 'yatube',
+        'VERSION': int(os.environ.get('CACHE_VERSION', 1)),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
     }
 }
+
+# Индекс полнотекстового поиска: 'fts5' — виртуальная таблица SQLite,
+# 'python' — таблица слов posts.SearchToken, 'auto' — FTS5, если он есть.
+# После смены бэкенда индекс пересобирается командой rebuild_search_index.
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto')
+
+# Метрики запросов: заголовок Server-Timing и /metrics/ для Prometheus,
+# доступный только с адресов METRICS_ALLOWED_IPS. Пик памяти за запрос
+# считается через tracemalloc, который замедляет работу, поэтому
+# включается отдельно переменной PERF_TRACE_MEMORY.
+METRICS_ALLOWED_IPS = os.environ.get(
+    'METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+PERF_TRACE_MEMORY = os.environ.get('PERF_TRACE_MEMORY') == '1'
+
+# Поиск N+1 и медленных запросов (core.queries). Доля проверяемых
+# ответов — QUERY_INSPECTOR_SAMPLE_RATE; запрос дольше SLOW_QUERY_MS
+# миллисекунд или повторённый NPLUSONE_THRESHOLD раз за ответ пишется
+# в лог core.queries. QUERY_BUDGETS — предельное число запросов view;
+# при QUERY_BUDGET_STRICT превышение бюджета — ошибка. Тесты проверяют
+# бюджеты строго, а выборку включают только там, где она нужна.
+QUERY_INSPECTOR_SAMPLE_RATE = float(os.environ.get(
+    'QUERY_INSPECTOR_SAMPLE_RATE', 1 if DEBUG else 0.01))
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+NPLUSONE_THRESHOLD = 5
+# Бюджеты измерены тестом posts.tests.test_query_budgets: в тестах и без
+# воркеров фоновые задачи записи (ленты, индекс поиска) выполняются в
+# самом запросе и входят в бюджет post_create и post_edit.
+QUERY_BUDGETS = {
+    'posts:index': 5,
+    'posts:group_posts': 6,
+    'posts:profile': 6,
+    'posts:post_detail': 5,
+    'posts:post_comments': 2,
+    'posts:follow_index': 4,
+    'posts:search': 6,
+    'posts:post_create': 18,
+    'posts:post_edit': 14,
+}
+QUERY_BUDGET_STRICT = False
+
+# Сколько секунд обратный прокси может отдавать анонимным читателям
+# сохранённые ленты и страницы постов (Cache-Control: s-maxage).
+# Браузеры каждый раз перепроверяют страницу по ETag.
+PROXY_CACHE_SECONDS = int(os.environ.get('PROXY_CACHE_SECONDS', 30))
+
+# Сколько секунд хранятся в кэше целые страницы лент и постов. Страницы
+# общие для всех читателей (личные фрагменты вставляет HoleMiddleware),
+# а при изменении данных ключ меняется вместе с поколениями posts.caching.
+PAGE_CACHE_SECONDS = int(os.environ.get('PAGE_CACHE_SECONDS', 3600))